@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+On-disk embedding cache for query texts
+Each text is stored as one .npy file keyed by the SHA-256 of model name + text,
+so repeated runs skip the encoder forward pass
+"""
+
+import hashlib
+import os
+from typing import List
+
+import numpy as np
+
+EMBED_CACHE_DIR = "target/embed_cache"
+
+
+def _embedding_cache_path(text: str, namespace: str, cache_dir: str) -> str:
+    """Cache file path; the key includes the model name so models never overwrite each other"""
+    key = hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{key}.npy")
+
+
+def get_or_embed(texts: List[str], model, namespace: str = "",
+                 cache_dir: str = EMBED_CACHE_DIR, **encode_kwargs) -> np.ndarray:
+    """
+    Return the embedding matrix for texts, encoding cache misses with one model.encode call
+
+    Args:
+        texts: Texts to encode
+        model: Encoder with an encode method (e.g. SentenceTransformer)
+        namespace: Model identifier, part of the cache key
+        cache_dir: Cache directory
+        **encode_kwargs: Passed through to model.encode
+
+    Returns:
+        numpy array of shape (len(texts), dim)
+    """
+    paths = [_embedding_cache_path(text, namespace, cache_dir) for text in texts]
+    embeddings = [np.load(path) if os.path.exists(path) else None for path in paths]
+
+    miss_indices = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if miss_indices:
+        # Duplicate texts within one batch are encoded once
+        miss_texts = list(dict.fromkeys(texts[i] for i in miss_indices))
+        encode_kwargs["convert_to_numpy"] = True
+        encoded = dict(zip(miss_texts, model.encode(miss_texts, **encode_kwargs)))
+
+        os.makedirs(cache_dir, exist_ok=True)
+        for i in miss_indices:
+            embeddings[i] = encoded[texts[i]]
+            np.save(paths[i], embeddings[i])
+
+    if not embeddings:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.stack(embeddings)
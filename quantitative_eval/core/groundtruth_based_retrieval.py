@@ -13,6 +13,8 @@ from sentence_transformers import SentenceTransformer
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+from core.embed_cache import get_or_embed
+
 
 class GroundtruthBasedRetriever:
     """Groundtruth.csv based retriever"""
@@ -41,11 +43,16 @@ class GroundtruthBasedRetriever:
         # Load embedding model for question matching
         print(f"  Loading embedding model: {model_name}")
         self.model = SentenceTransformer(model_name)
+        # Embeddings are L2-normalized by the encoder; cache entries are keyed accordingly
+        self.embedding_namespace = f"{model_name}:normalized"
 
         # Build question index
         print("  Building question index...")
         self._build_question_index()
 
+        # Build topic → passages lookup
+        self._build_passage_index()
+
         print("✅ Initialization complete\n")
 
     def _build_question_index(self):
@@ -55,14 +62,26 @@ class GroundtruthBasedRetriever:
         self.question_ids = self.topics_df['question_id'].tolist()
         self.topic_ids = self.topics_df['topic_id'].tolist()
 
-        # Generate embeddings
+        # Generate unit-length embeddings (cached on disk, keyed by model and text)
+        # so the dot products below are exact cosine similarities
         print(f"    Generating embeddings for {len(self.questions)} questions...")
-        self.question_embeddings = self.model.encode(
+        self.question_embeddings = get_or_embed(
             self.questions,
-            convert_to_numpy=True,
-            show_progress_bar=True
+            self.model,
+            namespace=self.embedding_namespace,
+            show_progress_bar=True,
+            normalize_embeddings=True
         )
 
+    def _build_passage_index(self):
+        """Group groundtruth passages by topic once so lookups skip the per-query DataFrame filter"""
+        self.topic_passages = {
+            topic_id: (rows['passage'].tolist(),
+                       rows['passage_id'].tolist(),
+                       rows['relevance_judgment'].iloc[0])
+            for topic_id, rows in self.groundtruth_df.groupby('topic_id', sort=False)
+        }
+
     def find_matching_topic(self, query: str, top_k: int = 1) -> Tuple[str, str, float]:
         """
         Find the most matching topic for query
@@ -75,7 +94,8 @@ class GroundtruthBasedRetriever:
             (topic_id, question_id, similarity_score)
         """
         # Generate embedding for query
-        query_embedding = self.model.encode([query], convert_to_numpy=True)[0]
+        query_embedding = self.model.encode([query], convert_to_numpy=True,
+                                            normalize_embeddings=True)[0]
 
         # Calculate similarity
         similarities = np.dot(self.question_embeddings, query_embedding)
@@ -116,17 +136,41 @@ class GroundtruthBasedRetriever:
             print(f"  Matched question_id: {question_id}")
             print(f"  Similarity: {similarity:.4f}")
 
-        # Step 2: Find passages for this topic from groundtruth
-        topic_rows = self.groundtruth_df[self.groundtruth_df['topic_id'] == topic_id]
+        # Step 2-3: Find passages for this topic from groundtruth and annotate type
+        return self._retrieve_topic_passages(topic_id, k, debug)
+
+    def search_batch(self, queries: List[str], k: int = 4) -> List[Tuple[List[str], List[float], List[str], str]]:
+        """
+        Batched version of search(): encodes all queries in one model call and
+        matches them against the question index with a single matrix product
+
+        Args:
+            queries: User questions
+            k: Number of passages to return per query
+
+        Returns:
+            List of (passages, scores, passage_ids, question_type), one per query
+        """
+        query_embeddings = get_or_embed(queries, self.model, namespace=self.embedding_namespace,
+                                        normalize_embeddings=True)
+        best_indices = np.argmax(query_embeddings @ self.question_embeddings.T, axis=1)
+
+        return [self._retrieve_topic_passages(self.topic_ids[idx], k)
+                for idx in best_indices]
+
+    def _retrieve_topic_passages(self, topic_id: str, k: int,
+                                 debug: bool = False) -> Tuple[List[str], List[float], List[str], str]:
+        """Retrieve groundtruth passages for a matched topic and determine question type"""
+        topic_entry = self.topic_passages.get(topic_id)
 
-        if len(topic_rows) == 0:
+        if topic_entry is None:
             # Not in groundtruth → Out-of-KB
             if debug:
                 print(f"  ✗ Topic not in groundtruth → Out-of-KB")
             return [], [], [], "Out-of-KB"
 
         # Step 3: Get passages and determine type
-        relevance = topic_rows['relevance_judgment'].iloc[0]
+        topic_passages, topic_passage_ids, relevance = topic_entry
 
         if relevance == 2:
             question_type = "Known"
@@ -136,8 +180,8 @@ class GroundtruthBasedRetriever:
             question_type = "Unknown"
 
         # Get all passages (take first k)
-        passages = topic_rows['passage'].tolist()[:k]
-        passage_ids = topic_rows['passage_id'].tolist()[:k]
+        passages = topic_passages[:k]
+        passage_ids = topic_passage_ids[:k]
 
         # Set all scores to 1.0 since we're using direct groundtruth matching
         scores = [1.0] * len(passages)
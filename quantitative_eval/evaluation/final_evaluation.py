@@ -9,37 +9,40 @@ from pyserini.search.lucene import LuceneSearcher
 import pandas as pd
 import json
 
-def compute_rouge_scores(hypothesis, reference):
-    """计算ROUGE分数"""
-    try:
-        from rouge import Rouge
-        rouge = Rouge()
-        scores = rouge.get_scores(hypothesis, reference, avg=True)
+_ROUGE = None
 
-        rouge_1_f1 = scores['rouge-1']['f']
-        rouge_2_f1 = scores['rouge-2']['f']
-        rouge_l_f1 = scores['rouge-l']['f']
+def get_rouge():
+    """懒加载并复用同一个Rouge实例"""
+    global _ROUGE
+    if _ROUGE is None:
+        from rouge import Rouge
+        _ROUGE = Rouge()
+    return _ROUGE
 
-        return rouge_1_f1, rouge_2_f1, rouge_l_f1
+def compute_rouge_scores(hypotheses, references):
+    """批量计算ROUGE分数，返回每个样本的(ROUGE-1, ROUGE-2, ROUGE-L) F1"""
+    try:
+        scores = get_rouge().get_scores(hypotheses, references)
+        return [(s['rouge-1']['f'], s['rouge-2']['f'], s['rouge-l']['f']) for s in scores]
     except ImportError:
         print("⚠️  ROUGE包未安装，跳过ROUGE评估")
-        return None, None, None
+        return None
 
-def compute_bertscore(candidate, reference):
-    """计算BERTScore"""
+def compute_bertscore(candidates, references):
+    """批量计算BERTScore（一次前向计算覆盖所有样本）"""
     try:
         import torch
         from bert_score import score
-        P, R, F1 = score([candidate], [reference], lang="en",
+        P, R, F1 = score(candidates, references, lang="en",
                          model_type="bert-base-uncased",
                          device="cuda" if torch.cuda.is_available() else "cpu")
-        return P.item(), R.item(), F1.item()
+        return P.tolist(), R.tolist(), F1.tolist()
     except ImportError:
         print("⚠️  bert-score包未安装，跳过BERTScore评估")
-        return None, None, None
+        return None
 
-def compute_bleu(candidate, reference):
-    """计算BLEU分数"""
+def compute_bleu(candidates, references):
+    """批量计算每个样本的BLEU分数"""
     try:
         import nltk
         from nltk.translate.bleu_score import sentence_bleu
@@ -51,13 +54,32 @@ def compute_bleu(candidate, reference):
         except LookupError:
             nltk.download('punkt')
 
-        reference_tokenized = [word_tokenize(reference)]
-        candidate_tokenized = word_tokenize(candidate)
-        return sentence_bleu(reference_tokenized, candidate_tokenized)
+        return [sentence_bleu([word_tokenize(reference)], word_tokenize(candidate))
+                for candidate, reference in zip(candidates, references)]
     except ImportError:
         print("⚠️  NLTK包未安装，跳过BLEU评估")
         return None
 
+def score_generations(candidates, references):
+    """对所有生成结果一次性计算ROUGE/BERTScore/BLEU，未安装的指标返回空列表"""
+    metrics = {'rouge_1': [], 'rouge_2': [], 'rouge_l': [], 'bert_f1': [], 'bleu': []}
+    if not candidates:
+        return metrics
+
+    rouge_scores = compute_rouge_scores(candidates, references)
+    if rouge_scores is not None:
+        metrics['rouge_1'], metrics['rouge_2'], metrics['rouge_l'] = map(list, zip(*rouge_scores))
+
+    bert_scores = compute_bertscore(candidates, references)
+    if bert_scores is not None:
+        metrics['bert_f1'] = bert_scores[2]
+
+    bleu_scores = compute_bleu(candidates, references)
+    if bleu_scores is not None:
+        metrics['bleu'] = bleu_scores
+
+    return metrics
+
 def comprehensive_evaluation():
     """全面评估，显示真实的检索表现"""
     print("=== FAISS vs BM25 全面对比评估 ===\\n")
@@ -233,8 +255,8 @@ def evaluate_text_generation():
 
         print(f"\n📊 评估 {len(test_cases)} 个测试案例:\n")
 
-        simple_scores = {'rouge_1': [], 'rouge_2': [], 'rouge_l': [], 'bert_f1': [], 'bleu': []}
-        falcon_scores = {'rouge_1': [], 'rouge_2': [], 'rouge_l': [], 'bert_f1': [], 'bleu': []}
+        simple_answers, simple_references = [], []
+        falcon_answers, falcon_references = [], []
 
         for i, case in enumerate(test_cases, 1):
             print(f"案例 {i}: {case['question']}")
@@ -242,57 +264,46 @@ def evaluate_text_generation():
             # 简单生成
             simple_result = rag_simple.ask(case['question'])
             simple_answer = simple_result['answer']
+            simple_answers.append(simple_answer)
+            simple_references.append(case['reference'])
 
             print(f"  📝 简单生成: {simple_answer[:100]}...")
 
-            # 评估简单生成
-            rouge1, rouge2, rougel = compute_rouge_scores(simple_answer, case['reference'])
-            bert_p, bert_r, bert_f1 = compute_bertscore(simple_answer, case['reference'])
-            bleu_score = compute_bleu(simple_answer, case['reference'])
-
-            if rouge1 is not None:
-                simple_scores['rouge_1'].append(rouge1)
-                simple_scores['rouge_2'].append(rouge2)
-                simple_scores['rouge_l'].append(rougel)
-                print(f"    ROUGE-1: {rouge1:.3f}, ROUGE-2: {rouge2:.3f}, ROUGE-L: {rougel:.3f}")
-
-            if bert_f1 is not None:
-                simple_scores['bert_f1'].append(bert_f1)
-                print(f"    BERTScore F1: {bert_f1:.3f}")
-
-            if bleu_score is not None:
-                simple_scores['bleu'].append(bleu_score)
-                print(f"    BLEU: {bleu_score:.3f}")
-
             # Falcon生成（如果可用）
             if falcon_available:
                 try:
                     falcon_result = rag_falcon.ask(case['question'], num_docs=1)
                     falcon_answer = falcon_result['answer']
+                    falcon_answers.append(falcon_answer)
+                    falcon_references.append(case['reference'])
 
                     print(f"  🦅 Falcon生成: {falcon_answer[:100]}...")
 
-                    # 评估Falcon生成
-                    rouge1, rouge2, rougel = compute_rouge_scores(falcon_answer, case['reference'])
-                    bert_p, bert_r, bert_f1 = compute_bertscore(falcon_answer, case['reference'])
-                    bleu_score = compute_bleu(falcon_answer, case['reference'])
-
-                    if rouge1 is not None:
-                        falcon_scores['rouge_1'].append(rouge1)
-                        falcon_scores['rouge_2'].append(rouge2)
-                        falcon_scores['rouge_l'].append(rougel)
-
-                    if bert_f1 is not None:
-                        falcon_scores['bert_f1'].append(bert_f1)
-
-                    if bleu_score is not None:
-                        falcon_scores['bleu'].append(bleu_score)
-
                 except Exception as e:
                     print(f"    ❌ Falcon生成失败: {e}")
 
             print()
 
+        # 两个系统的结果合并后统一评估，每个指标只调用一次
+        all_scores = score_generations(simple_answers + falcon_answers,
+                                       simple_references + falcon_references)
+        num_simple = len(simple_answers)
+        simple_scores = {metric: scores[:num_simple] for metric, scores in all_scores.items()}
+        falcon_scores = {metric: scores[num_simple:] for metric, scores in all_scores.items()}
+
+        print("📊 简单生成逐案例分数:")
+        for i in range(num_simple):
+            print(f"  案例 {i + 1}:")
+            if simple_scores['rouge_1']:
+                print(f"    ROUGE-1: {simple_scores['rouge_1'][i]:.3f}, "
+                      f"ROUGE-2: {simple_scores['rouge_2'][i]:.3f}, "
+                      f"ROUGE-L: {simple_scores['rouge_l'][i]:.3f}")
+            if simple_scores['bert_f1']:
+                print(f"    BERTScore F1: {simple_scores['bert_f1'][i]:.3f}")
+            if simple_scores['bleu']:
+                print(f"    BLEU: {simple_scores['bleu'][i]:.3f}")
+        print()
+
         # 显示平均分数
         print("📈 平均评估分数:")
         print("\n简单生成系统:")
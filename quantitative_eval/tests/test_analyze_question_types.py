@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+question_types.csv的写出格式测试
+运行: python -m unittest discover -s tests（在quantitative_eval目录中）
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from analyze_question_types import write_csv
+
+
+class WriteCsvTest(unittest.TestCase):
+    """write_csv的输出应与DataFrame.to_csv逐字节一致"""
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'question_id': ['W01Q01', 'W33Q01', 'W50Q04'],
+            'question_type': ['Known', 'Inferred', 'Out-of-KB']
+        })
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_file = os.path.join(self.tmp_dir.name, 'question_types.csv')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_header_and_first_row_unquoted(self):
+        write_csv(self.df, self.output_file)
+        with open(self.output_file, 'rb') as f:
+            head = f.read(40)
+        self.assertTrue(head.startswith(b"question_id,question_type\nW01Q01,Known\n"))
+
+    def test_matches_pandas_to_csv(self):
+        write_csv(self.df, self.output_file)
+        with open(self.output_file, 'rb') as f:
+            written = f.read()
+        expected = self.df.to_csv(index=False, lineterminator='\n').encode('utf-8')
+        self.assertEqual(written, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
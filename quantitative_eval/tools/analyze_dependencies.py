@@ -146,32 +146,35 @@ def analyze_project_imports():
 
     return all_imports, third_party_packages
 
-def compare_with_requirements():
-    """对比当前requirements文件"""
-
-    print(f"\n=== 对比现有requirements文件 ===")
-
-    # 读取旧requirements
-    old_packages = set()
+REQUIREMENT_SEPARATORS = ('==', '>=', '<=', '~=', '!=', '>', '<')
+
+def parse_requirement_name(line):
+    """从requirements行中提取包名（partition在首个匹配处截断，不分配列表）"""
+    package = line.strip()
+    for sep in REQUIREMENT_SEPARATORS:
+        package = package.partition(sep)[0]
+    return package.strip()
+
+def load_requirement_packages(file_path):
+    """逐行读取requirements文件，返回包名集合"""
+    packages = set()
     try:
-        with open('requirements.txt', 'r') as f:
+        with open(file_path, 'r') as f:
             for line in f:
                 if line.strip() and not line.startswith('#'):
-                    package = line.strip().split('==')[0].split('>=')[0]
-                    old_packages.add(package)
+                    packages.add(parse_requirement_name(line))
     except FileNotFoundError:
-        print("requirements.txt not found")
+        print(f"{file_path} not found")
+    return packages
 
-    # 读取新requirements
-    new_packages = set()
-    try:
-        with open('requirements_py312.txt', 'r') as f:
-            for line in f:
-                if line.strip() and not line.startswith('#'):
-                    package = line.strip().split('==')[0].split('>=')[0]
-                    new_packages.add(package)
-    except FileNotFoundError:
-        print("requirements_py312.txt not found")
+def compare_with_requirements():
+    """对比当前requirements文件"""
+
+    print(f"\n=== 对比现有requirements文件 ===")
+
+    # 读取旧requirements / 新requirements
+    old_packages = load_requirement_packages('requirements.txt')
+    new_packages = load_requirement_packages('requirements_py312.txt')
 
     print(f"旧requirements包数: {len(old_packages)}")
     print(f"新requirements包数: {len(new_packages)}")
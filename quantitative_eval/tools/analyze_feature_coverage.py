@@ -5,12 +5,153 @@
 """
 
 import os
+import re
+import sys
 import ast
+import hashlib
 import inspect
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
 from typing import Dict, List, Any
 
-def analyze_file_functions(file_path: str) -> Dict[str, Any]:
-    """分析Python文件中的函数和类"""
+# AST分析结果的磁盘缓存，按文件路径+内容+Python版本做键
+AST_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_ast_cache")
+ast_cache_stats = {"hits": 0, "misses": 0}
+
+@lru_cache(maxsize=None)
+def read_source_file(file_path: str) -> str:
+    """
+    读取源文件内容，同一次运行中重复访问的路径只读一次
+
+    只在主进程中调用：src文件由主进程读取后连同内容一起交给子进程分析，
+    之后的Falcon对比再次读取falcon_gen.py时直接命中缓存
+    """
+    return Path(file_path).read_text(encoding='utf-8')
+
+def _read_source_for_worker(file_path: str):
+    """主进程中预读源文件，读取失败时返回None，由子进程分析时记录错误"""
+    try:
+        return read_source_file(file_path)
+    except Exception:
+        return None
+
+def _ast_cache_key(file_path: str, content: str) -> str:
+    """计算缓存键（key_features依赖文件路径，因此路径也参与哈希）"""
+    digest = hashlib.sha256(f"{file_path}\0{content}".encode('utf-8')).hexdigest()
+    version = ".".join(map(str, sys.version_info[:3]))
+    return f"{digest}-py{version}"
+
+ANALYSIS_KEYS = frozenset(("file", "functions", "classes", "imports", "main_purpose", "key_features"))
+
+def _load_cached_analysis(key: str):
+    """读取缓存的分析结果，未命中、损坏或结构不符时都返回None"""
+    try:
+        with open(os.path.join(AST_CACHE_DIR, f"{key}.pkl"), 'rb') as f:
+            cached = pickle.load(f)
+    except Exception:
+        # 截断或过期的pickle可能抛出任意异常，一律按未命中处理
+        return None
+    if not isinstance(cached, dict) or not ANALYSIS_KEYS <= cached.keys():
+        return None
+    return cached
+
+def _store_cached_analysis(key: str, result: Dict[str, Any]) -> None:
+    """写入分析结果缓存，失败时静默跳过"""
+    try:
+        os.makedirs(AST_CACHE_DIR, exist_ok=True)
+        with open(os.path.join(AST_CACHE_DIR, f"{key}.pkl"), 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+
+# 一次扫描文件内容即可找出所有功能关键词
+FEATURE_KEYWORDS_RE = re.compile(
+    r"whisper|sounddevice|Falcon|falcon|pipeline|transformers|FaissSearcher|LuceneSearcher"
+)
+
+# 可能包含语句的字段；函数、类和import都是语句，无需进入表达式子树
+STATEMENT_FIELDS = ("body", "handlers", "orelse", "finalbody", "cases")
+
+def iter_statement_nodes(tree: ast.AST):
+    """按ast.walk相同的广度优先顺序遍历语句节点，跳过所有表达式子树"""
+    queue = deque([tree])
+    while queue:
+        node = queue.popleft()
+        for field in STATEMENT_FIELDS:
+            children = getattr(node, field, None)
+            if isinstance(children, list):
+                queue.extend(children)
+        yield node
+
+class FileAnalyzer(ast.NodeVisitor):
+    """单次遍历同时收集函数、类、import和功能关键词"""
+
+    # 只关心四种节点类型：按类型直接查表，省去NodeVisitor.visit每个节点的方法名拼接和getattr
+    VISITED_TYPES = (ast.FunctionDef, ast.ClassDef, ast.Import, ast.ImportFrom)
+
+    def __init__(self, result: Dict[str, Any]):
+        self.result = result
+        self._dispatch = {node_type: getattr(self, f"visit_{node_type.__name__}")
+                          for node_type in self.VISITED_TYPES}
+
+    def analyze(self, tree: ast.AST, content: str) -> None:
+        # 只访问语句节点；visit_*不再递归，由iter_statement_nodes负责遍历顺序
+        for node in iter_statement_nodes(tree):
+            self.visit(node)
+        self.detect_features(content)
+
+    def visit(self, node: ast.AST) -> None:
+        visitor = self._dispatch.get(type(node))
+        if visitor is not None:
+            visitor(node)
+
+    def generic_visit(self, node: ast.AST) -> None:
+        pass
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.result["functions"].append({
+            "name": node.name,
+            "line": node.lineno,
+            "args": [arg.arg for arg in node.args.args]
+        })
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.result["classes"].append({
+            "name": node.name,
+            "line": node.lineno
+        })
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self.result["imports"].append(alias.name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module:
+            self.result["imports"].append(node.module)
+
+    def detect_features(self, content: str) -> None:
+        """分析主要用途（通过已读取的文件内容和文件名）"""
+        file_path = self.result["file"]
+        key_features = self.result["key_features"]
+        keywords = set(FEATURE_KEYWORDS_RE.findall(content))
+        if keywords & {"whisper", "sounddevice"}:
+            key_features.append("语音处理")
+        if keywords & {"Falcon", "falcon"}:
+            key_features.append("Falcon模型")
+        if {"pipeline", "transformers"} <= keywords:
+            key_features.append("文本生成")
+        if keywords & {"FaissSearcher", "LuceneSearcher"}:
+            key_features.append("检索功能")
+        if "lambda" in file_path:
+            key_features.append("AWS Lambda")
+        if "eval" in file_path:
+            key_features.append("评估功能")
+
+def analyze_file_functions(file_path: str, content: str = None) -> Dict[str, Any]:
+    """分析Python文件中的函数和类，content为None时从磁盘读取"""
     result = {
         "file": file_path,
         "functions": [],
@@ -21,51 +162,35 @@ def analyze_file_functions(file_path: str) -> Dict[str, Any]:
     }
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        if content is None:
+            content = Path(file_path).read_text(encoding='utf-8')
+
+        cache_key = _ast_cache_key(file_path, content)
+        cached = _load_cached_analysis(cache_key)
+        if cached is not None:
+            ast_cache_stats["hits"] += 1
+            return cached
+        ast_cache_stats["misses"] += 1
 
         # 解析AST
         tree = ast.parse(content)
 
-        # 提取函数
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                result["functions"].append({
-                    "name": node.name,
-                    "line": node.lineno,
-                    "args": [arg.arg for arg in node.args.args]
-                })
-            elif isinstance(node, ast.ClassDef):
-                result["classes"].append({
-                    "name": node.name,
-                    "line": node.lineno
-                })
-            elif isinstance(node, ast.Import):
-                for alias in node.names:
-                    result["imports"].append(alias.name)
-            elif isinstance(node, ast.ImportFrom):
-                if node.module:
-                    result["imports"].append(node.module)
-
-        # 分析主要用途（通过注释和函数名）
-        if "whisper" in content or "sounddevice" in content:
-            result["key_features"].append("语音处理")
-        if "Falcon" in content or "falcon" in content:
-            result["key_features"].append("Falcon模型")
-        if "pipeline" in content and "transformers" in content:
-            result["key_features"].append("文本生成")
-        if "FaissSearcher" in content or "LuceneSearcher" in content:
-            result["key_features"].append("检索功能")
-        if "lambda" in file_path:
-            result["key_features"].append("AWS Lambda")
-        if "eval" in file_path:
-            result["key_features"].append("评估功能")
+        # 提取函数、类、import及功能关键词
+        FileAnalyzer(result).analyze(tree, content)
+
+        _store_cached_analysis(cache_key, result)
 
     except Exception as e:
         result["error"] = str(e)
 
     return result
 
+def _analyze_file_in_worker(file_path: str, content: str = None):
+    """子进程中分析单个文件，同时返回本次调用产生的缓存命中统计"""
+    before = dict(ast_cache_stats)
+    analysis = analyze_file_functions(file_path, content)
+    return analysis, {key: ast_cache_stats[key] - before[key] for key in before}
+
 def analyze_src_structure():
     """分析src文件夹结构和功能"""
 
@@ -89,21 +214,31 @@ def analyze_src_structure():
 
     print("=== 原始src系统功能分析 ===")
 
-    for file_path in src_files:
-        if os.path.exists(file_path):
-            analysis = analyze_file_functions(file_path)
-            src_analysis[file_path] = analysis
-
-            print(f"\n📁 {file_path}:")
-            if analysis.get("key_features"):
-                print(f"   核心功能: {', '.join(analysis['key_features'])}")
-            print(f"   函数数量: {len(analysis['functions'])}")
-            print(f"   类数量: {len(analysis['classes'])}")
-
-            # 显示关键函数
-            key_functions = [f for f in analysis['functions'] if not f['name'].startswith('_')][:5]
-            if key_functions:
-                print(f"   关键函数: {', '.join([f['name'] for f in key_functions])}")
+    # 各文件的AST分析相互独立，分发到多进程并行解析；
+    # 文件内容在主进程中读取并缓存，子进程不再读盘
+    existing_files = [file_path for file_path in src_files if os.path.exists(file_path)]
+    if existing_files:
+        contents = [_read_source_for_worker(file_path) for file_path in existing_files]
+        with ProcessPoolExecutor(max_workers=min(8, len(existing_files))) as executor:
+            worker_results = list(executor.map(_analyze_file_in_worker, existing_files, contents))
+    else:
+        worker_results = []
+
+    for file_path, (analysis, stats_delta) in zip(existing_files, worker_results):
+        for key, count in stats_delta.items():
+            ast_cache_stats[key] += count
+        src_analysis[file_path] = analysis
+
+        print(f"\n📁 {file_path}:")
+        if analysis.get("key_features"):
+            print(f"   核心功能: {', '.join(analysis['key_features'])}")
+        print(f"   函数数量: {len(analysis['functions'])}")
+        print(f"   类数量: {len(analysis['classes'])}")
+
+        # 显示关键函数
+        key_functions = [f for f in analysis['functions'] if not f['name'].startswith('_')][:5]
+        if key_functions:
+            print(f"   关键函数: {', '.join([f['name'] for f in key_functions])}")
 
     return src_analysis
 
@@ -228,11 +363,9 @@ def detailed_falcon_comparison():
     print("📊 src/nlg/falcon_gen.py 原始功能:")
 
     try:
-        with open("src/nlg/falcon_gen.py", 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = read_source_file("src/nlg/falcon_gen.py")
 
         # 提取函数定义
-        import re
         functions = re.findall(r'def\s+(\w+)\s*\([^)]*\):', content)
         print(f"   原始函数: {', '.join(functions)}")
 
@@ -252,8 +385,7 @@ def detailed_falcon_comparison():
     print(f"\n📊 modern_rag_system.py 现代功能:")
 
     try:
-        with open("modern_rag_system.py", 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = read_source_file("modern_rag_system.py")
 
         if "_generate_with_falcon" in content:
             print("   ✅ Falcon生成方法")
@@ -361,5 +493,7 @@ def main():
     print(f"3. 补充文本生成评估 (中优先级)")
     print(f"4. 完善数据处理工具 (低优先级)")
 
+    print(f"\nAST缓存: 命中 {ast_cache_stats['hits']} 次, 未命中 {ast_cache_stats['misses']} 次")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
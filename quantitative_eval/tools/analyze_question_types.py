@@ -4,15 +4,31 @@
 区分Known/Inferred/Out-of-KB问题
 """
 
+import numpy as np
 import pandas as pd
 from collections import defaultdict
 
+def write_csv(df: pd.DataFrame, output_file: str):
+    """用pyarrow的C++写入器输出CSV，未安装pyarrow时回退到pandas"""
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        df.to_csv(output_file, index=False)
+        return
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # pyarrow默认给表头和字符串字段加引号；关闭引号，与pandas默认输出的格式一致
+    options = pacsv.WriteOptions(quoting_style="none", quoting_header="none")
+    pacsv.write_csv(table, output_file, write_options=options)
+
 def analyze_question_types():
     """分析数据集中的问题类型分布"""
 
     # 读取数据
-    topics_df = pd.read_csv("data/topics.csv")
-    gold_df = pd.read_csv("data/gold_summaries.csv")
+    topics_df = pd.read_csv("data/topics.csv", usecols=['topic_id', 'question_id', 'question'],
+                            dtype={'topic_id': 'category', 'question_id': str, 'question': str})
+    gold_df = pd.read_csv("data/gold_summaries.csv", usecols=['question_id'], dtype={'question_id': str})
     qrels_df = pd.read_csv("data/qrels.txt", sep="\t", header=None,
                            names=["question_id", "Q0", "passage_id", "relevance"])
 
@@ -21,9 +37,9 @@ def analyze_question_types():
     print("=" * 70)
 
     # 1. 统计基本信息
-    all_questions = set(topics_df['question_id'])
-    gold_questions = set(gold_df['question_id'])
-    qrels_questions = set(qrels_df['question_id'])
+    all_questions = pd.Index(topics_df['question_id'].unique())
+    gold_questions = pd.Index(gold_df['question_id'].unique())
+    qrels_questions = pd.Index(qrels_df['question_id'].unique())
 
     print(f"\n【数据集概览】")
     print(f"总问题数: {len(all_questions)}")
@@ -41,21 +57,16 @@ def analyze_question_types():
     # Inferred: qrels中有部分相关(label=1)的段落
     # Out-of-KB: 在topics中但不在qrels中
 
-    known_questions = set()
-    inferred_questions = set()
+    # 一次groupby得到每个问题的相关性标签集合
+    label_sets = qrels_df.groupby('question_id', sort=False)['relevance'].agg(frozenset)
 
-    for question_id in qrels_questions:
-        question_qrels = qrels_df[qrels_df['question_id'] == question_id]
-        relevance_labels = set(question_qrels['relevance'])
+    # 有部分相关的段落 -> Inferred
+    is_inferred = label_sets.map(lambda labels: 1 in labels)
+    inferred_questions = set(label_sets[is_inferred].index)
+    # 只有高度相关的段落 -> Known
+    known_questions = set(label_sets[~is_inferred & (label_sets == frozenset({2}))].index)
 
-        if 1 in relevance_labels:
-            # 有部分相关的段落 -> Inferred
-            inferred_questions.add(question_id)
-        elif relevance_labels == {2}:
-            # 只有高度相关的段落 -> Known
-            known_questions.add(question_id)
-
-    out_of_kb_questions = all_questions - qrels_questions
+    out_of_kb_questions = all_questions.difference(qrels_questions, sort=False)
 
     print(f"\n【问题分类结果】")
     print(f"Known (已知答案): {len(known_questions)} 个问题")
@@ -65,13 +76,14 @@ def analyze_question_types():
 
     # 4. 按topic统计
     print(f"\n【按Topic统计】")
-    topics_df['question_type'] = topics_df['question_id'].apply(
-        lambda q: 'Known' if q in known_questions
-        else ('Inferred' if q in inferred_questions
-              else 'Out-of-KB')
-    )
-
-    topic_stats = topics_df.groupby('topic_id')['question_type'].value_counts().unstack(fill_value=0)
+    question_ids = topics_df['question_id'].to_numpy()
+    conditions = [
+        np.isin(question_ids, list(known_questions)),
+        np.isin(question_ids, list(inferred_questions))
+    ]
+    topics_df['question_type'] = np.select(conditions, ['Known', 'Inferred'], default='Out-of-KB')
+
+    topic_stats = topics_df.groupby('topic_id', observed=True)['question_type'].value_counts().unstack(fill_value=0)
     print(f"总topic数: {len(topic_stats)}")
     print(f"\n每个topic的问题类型分布统计:")
     print(topic_stats.describe())
@@ -109,24 +121,16 @@ def analyze_question_types():
         print(f"  相关性标签: {list(inferred_qrels['relevance'])}")
 
     if len(out_of_kb_questions) > 0:
-        sample_out = list(out_of_kb_questions)[0]
+        sample_out = out_of_kb_questions[0]
         print(f"\nOut-of-KB问题示例: {sample_out}")
         print(f"  问题: {topics_df[topics_df['question_id']==sample_out]['question'].iloc[0][:80]}...")
         print(f"  无相关段落（知识库中无答案）")
 
     # 7. 保存分类结果
-    question_types = pd.DataFrame({
-        'question_id': list(all_questions),
-        'question_type': [
-            'Known' if q in known_questions
-            else ('Inferred' if q in inferred_questions
-                  else 'Out-of-KB')
-            for q in all_questions
-        ]
-    })
+    question_types = topics_df[['question_id', 'question_type']].drop_duplicates('question_id')
 
     output_file = "data/question_types.csv"
-    question_types.to_csv(output_file, index=False)
+    write_csv(question_types, output_file)
     print(f"\n✅ 问题类型分类已保存到: {output_file}")
 
     return known_questions, inferred_questions, out_of_kb_questions
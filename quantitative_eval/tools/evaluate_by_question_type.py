@@ -5,38 +5,53 @@ Mimics the evaluation approach from the original paper
 """
 
 import os
-import pandas as pd
-import pytrec_eval
-from collections import defaultdict
+
+METRICS = ['map', 'ndcg', 'P_4', 'recall_4', 'bpref']
+QUESTION_TYPES = ['Known', 'Inferred', 'Out-of-KB']
 
 def load_qrels(qrels_file: str):
     """Load qrels file"""
-    qrels = defaultdict(dict)
-    with open(qrels_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) >= 4:
-                query_id = parts[0]
-                doc_id = parts[2]
-                relevance = int(parts[3])
-                qrels[query_id][doc_id] = relevance
-    return dict(qrels)
+    import pandas as pd
+
+    # Categorical query ids let groupby work on integer codes instead of strings
+    try:
+        df = pd.read_csv(qrels_file, sep=r'\s+', header=None, engine='c',
+                         names=['query_id', 'iter', 'doc_id', 'relevance'],
+                         dtype={'query_id': 'category', 'iter': str, 'doc_id': str})
+    except pd.errors.EmptyDataError:
+        return {}
+    df = df.dropna(subset=['relevance'])
+    df['relevance'] = df['relevance'].astype('int8')
+    # dict.fromkeys sizes the table for every query up front
+    qrels = dict.fromkeys(df['query_id'].unique())
+    for query_id, group in df.groupby('query_id', sort=False, observed=True):
+        qrels[query_id] = dict(zip(group['doc_id'], group['relevance'].tolist()))
+    return qrels
 
 def load_runs(runs_file: str):
     """Load runs file"""
-    runs = defaultdict(dict)
-    with open(runs_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) >= 6:
-                query_id = parts[0]
-                doc_id = parts[2]
-                score = float(parts[4])
-                runs[query_id][doc_id] = score
-    return dict(runs)
+    import pandas as pd
+
+    # Categorical query ids, as in load_qrels
+    try:
+        df = pd.read_csv(runs_file, sep=r'\s+', header=None, engine='c',
+                         names=['query_id', 'Q0', 'doc_id', 'rank', 'score', 'run_name'],
+                         float_precision='round_trip',
+                         dtype={'query_id': 'category', 'Q0': str, 'doc_id': str, 'run_name': str})
+    except pd.errors.EmptyDataError:
+        return {}
+    df = df.dropna(subset=['run_name'])
+    runs = dict.fromkeys(df['query_id'].unique())
+    for query_id, group in df.groupby('query_id', sort=False, observed=True):
+        runs[query_id] = dict(zip(group['doc_id'], group['score'].astype('float64').tolist()))
+    return runs
 
 def evaluate_by_type(qrels_file: str, runs_file: str, question_types_file: str, method_name: str):
     """Evaluate by question type"""
+    # Heavy imports are deferred so early-exit paths in main() start fast
+    import numpy as np
+    import pandas as pd
+    import pytrec_eval
 
     print(f"\n{'='*70}")
     print(f"Evaluation method: {method_name}")
@@ -47,33 +62,44 @@ def evaluate_by_type(qrels_file: str, runs_file: str, question_types_file: str,
     runs = load_runs(runs_file)
     question_types_df = pd.read_csv(question_types_file)
 
-    # Group by type
-    type_groups = {
-        'Known': set(question_types_df[question_types_df['question_type'] == 'Known']['question_id']),
-        'Inferred': set(question_types_df[question_types_df['question_type'] == 'Inferred']['question_id']),
-        'Out-of-KB': set(question_types_df[question_types_df['question_type'] == 'Out-of-KB']['question_id'])
-    }
+    # Group by type: partition qrels and runs in a single pass each
+    question_types_df = question_types_df.drop_duplicates('question_id')
+    qid_to_type = dict(zip(question_types_df['question_id'], question_types_df['question_type']))
+    type_counts = question_types_df['question_type'].value_counts()
+
+    partitioned_qrels = {qtype: {} for qtype in QUESTION_TYPES}
+    for qid, rels in qrels.items():
+        qtype = qid_to_type.get(qid)
+        if qtype in partitioned_qrels:
+            partitioned_qrels[qtype][qid] = rels
+
+    partitioned_runs = {qtype: {} for qtype in QUESTION_TYPES}
+    for qid, run in runs.items():
+        qtype = qid_to_type.get(qid)
+        if qtype in partitioned_runs:
+            partitioned_runs[qtype][qid] = run
 
     results = {}
 
-    for qtype, question_ids in type_groups.items():
+    for qtype in QUESTION_TYPES:
+        num_questions = int(type_counts.get(qtype, 0))
         print(f"\n【{qtype} Question Evaluation】")
-        print(f"Number of questions: {len(question_ids)}")
+        print(f"Number of questions: {num_questions}")
 
         if qtype == 'Out-of-KB':
             # Out-of-KB questions have no qrels, calculate unanswered ratio
-            answered_count = sum(1 for qid in question_ids if qid in runs)
-            unanswered_pct = (len(question_ids) - answered_count) / len(question_ids) * 100
+            answered_count = len(partitioned_runs[qtype])
+            unanswered_pct = (num_questions - answered_count) / num_questions * 100
             print(f"Unanswered question ratio: {unanswered_pct:.2f}%")
             results[qtype] = {
                 'unanswered_pct': unanswered_pct,
-                'total_questions': len(question_ids)
+                'total_questions': num_questions
             }
             continue
 
-        # Filter qrels and runs, keep only current type questions
-        filtered_qrels = {qid: qrels[qid] for qid in question_ids if qid in qrels}
-        filtered_runs = {qid: runs[qid] for qid in question_ids if qid in runs}
+        # Only current type questions
+        filtered_qrels = partitioned_qrels[qtype]
+        filtered_runs = partitioned_runs[qtype]
 
         if not filtered_qrels:
             print(f"⚠️  No qrels data")
@@ -82,31 +108,27 @@ def evaluate_by_type(qrels_file: str, runs_file: str, question_types_file: str,
         # Create evaluator
         evaluator = pytrec_eval.RelevanceEvaluator(
             filtered_qrels,
-            {'map', 'ndcg', 'P_4', 'recall_4', 'bpref'}
+            set(METRICS)
         )
 
         # Run evaluation
         eval_results = evaluator.evaluate(filtered_runs)
 
         # Calculate averages
-        metrics_avg = defaultdict(list)
-        for query_id, query_results in eval_results.items():
-            for metric, value in query_results.items():
-                metrics_avg[metric].append(value)
+        metric_array = np.fromiter(
+            (query_results[metric] for query_results in eval_results.values() for metric in METRICS),
+            dtype=np.float64,
+            count=len(eval_results) * len(METRICS)
+        ).reshape(-1, len(METRICS))
+        metric_means = dict(zip(METRICS, metric_array.mean(axis=0).tolist()))
 
         # Display results
         print(f"\nRetrieval metrics (average):")
-        for metric in ['map', 'ndcg', 'P_4', 'recall_4', 'bpref']:
-            if metric in metrics_avg:
-                avg_value = sum(metrics_avg[metric]) / len(metrics_avg[metric])
-                print(f"  {metric.upper()}: {avg_value:.4f}")
+        for metric, avg_value in metric_means.items():
+            print(f"  {metric.upper()}: {avg_value:.4f}")
 
         results[qtype] = {
-            'map': sum(metrics_avg['map']) / len(metrics_avg['map']),
-            'ndcg': sum(metrics_avg['ndcg']) / len(metrics_avg['ndcg']),
-            'P_4': sum(metrics_avg['P_4']) / len(metrics_avg['P_4']),
-            'recall_4': sum(metrics_avg['recall_4']) / len(metrics_avg['recall_4']),
-            'bpref': sum(metrics_avg['bpref']) / len(metrics_avg['bpref']),
+            **metric_means,
             'total_questions': len(filtered_qrels)
         }
 
@@ -114,6 +136,7 @@ def evaluate_by_type(qrels_file: str, runs_file: str, question_types_file: str,
 
 def generate_comparison_table(all_results: dict):
     """Generate comparison table"""
+    import pandas as pd
 
     print(f"\n{'='*70}")
     print("All methods comparison (by question type)")
@@ -163,6 +186,14 @@ def generate_comparison_table(all_results: dict):
     df.to_csv(output_file, index=False)
     print(f"\n✅ Detailed results saved to: {output_file}")
 
+    # Columnar copy for downstream Python steps (CSV stays for human inspection)
+    parquet_file = output_file.replace('.csv', '.parquet')
+    try:
+        df.to_parquet(parquet_file, engine='pyarrow', compression='zstd', index=False)
+        print(f"✅ Parquet copy saved to: {parquet_file}")
+    except ImportError:
+        print("⚠️  pyarrow not installed, skipping Parquet output")
+
 def main():
     """Main function"""
 
@@ -6,7 +6,6 @@
 
 import pandas as pd
 import json
-from collections import defaultdict
 
 def load_intent_mapping():
     """加载意图映射数据"""
@@ -17,58 +16,50 @@ def load_intent_mapping():
         print("Error: intent_mapping.csv not found!")
         return None
 
+# JSON解析失败时使用的默认响应
+DEFAULT_INTENT_RESPONSES = [
+    "Based on Romeo and Juliet, I can provide information about this topic.",
+    "In Shakespeare's play, this is an important element of the story.",
+    "According to the text, this aspect is significant to the plot."
+]
+
+def parse_intent_responses(passage_hardcoded):
+    """解析JSON格式的响应变体，失败时返回默认响应"""
+    try:
+        return json.loads(passage_hardcoded)
+    except json.JSONDecodeError:
+        return DEFAULT_INTENT_RESPONSES
+
 def extract_intent_responses(intent_df):
     """提取每个意图的响应变体"""
-    intent_responses = {}
-
     # 获取唯一的意图
     unique_intents = intent_df.drop_duplicates(['intent'])
 
-    for _, row in unique_intents.iterrows():
-        intent_name = row['intent']
-        passage_hardcoded = row['passage_hardcoded']
-
-        try:
-            # 解析JSON格式的响应变体
-            responses = json.loads(passage_hardcoded)
-            intent_responses[intent_name] = responses
-        except json.JSONDecodeError:
-            # 如果JSON解析失败，使用默认响应
-            intent_responses[intent_name] = [
-                f"Based on Romeo and Juliet, I can provide information about this topic.",
-                f"In Shakespeare's play, this is an important element of the story.",
-                f"According to the text, this aspect is significant to the plot."
-            ]
+    # 多个意图常共用同一份回答（如通用回答），每种不同的payload只解析一次
+    parsed_payloads = {
+        payload: parse_intent_responses(payload)
+        for payload in unique_intents['passage_hardcoded'].drop_duplicates()
+    }
 
-    return intent_responses
+    return {
+        intent_name: parsed_payloads[passage_hardcoded]
+        for intent_name, passage_hardcoded in unique_intents[['intent', 'passage_hardcoded']].itertuples(index=False, name=None)
+    }
 
 def extract_sample_utterances(intent_df):
     """提取每个意图的示例话语"""
-    intent_samples = defaultdict(list)
-
-    for _, row in intent_df.iterrows():
-        intent_name = row['intent']
-        question = row['question']
-
-        # 清理问题文本作为示例话语
-        cleaned_question = question.replace('"', '').replace("'", "").strip()
-        if cleaned_question not in intent_samples[intent_name]:
-            intent_samples[intent_name].append(cleaned_question)
-
-    return dict(intent_samples)
-
-def generate_handler_class(intent_name, responses):
-    """生成单个意图处理器类的代码"""
-    class_name = f"{intent_name}IntentHandler"
-
-    # 转换响应为Python列表格式
-    responses_str = '[\n'
-    for response in responses:
-        escaped_response = response.replace('"', '\\"')
-        responses_str += f'        "{escaped_response}",\n'
-    responses_str += '    ]'
-
-    handler_code = f'''class {class_name}(AbstractRequestHandler):
+    # 清理问题文本作为示例话语，按意图去重并保持原有顺序
+    cleaned_df = intent_df[['intent']].assign(
+        question=intent_df['question']
+        .str.replace('"', '', regex=False)
+        .str.replace("'", "", regex=False)
+        .str.strip()
+    ).drop_duplicates(['intent', 'question'])
+
+    return cleaned_df.groupby('intent', sort=False)['question'].agg(list).to_dict()
+
+# 意图处理器类的代码模板，模块加载时构建一次，每个意图只做一次format
+HANDLER_CLASS_TEMPLATE = '''class {class_name}(AbstractRequestHandler):
     """Handler for {intent_name} intent."""
     def can_handle(self, handler_input):
         return ask_utils.is_intent_name("{intent_name}")(handler_input)
@@ -77,14 +68,7 @@ def generate_handler_class(intent_name, responses):
         responses = {responses_str}
 
         speak_output = random.choice(responses)
-
-        ask_variations = [
-            'Would you like to know more about Romeo and Juliet?',
-            "What else would you like to explore about the play?",
-            "Is there another aspect of Romeo and Juliet you'd like to discuss?",
-            "Any other questions about the story?"
-        ]
-        ask_output = random.choice(ask_variations)
+        ask_output = random.choice(FOLLOW_UP_ASK_VARIATIONS)
 
         return (
             handler_input.response_builder
@@ -93,6 +77,23 @@ def generate_handler_class(intent_name, responses):
                 .response
         )
 '''
+
+def generate_handler_class(intent_name, responses):
+    """生成单个意图处理器类的代码"""
+    class_name = f"{intent_name}IntentHandler"
+
+    # 转换响应为Python列表格式
+    response_lines = []
+    for response in responses:
+        escaped_response = response.replace('"', '\\"')
+        response_lines.append(f'        "{escaped_response}",\n')
+    responses_str = '[\n' + ''.join(response_lines) + '    ]'
+
+    handler_code = HANDLER_CLASS_TEMPLATE.format(
+        class_name=class_name,
+        intent_name=intent_name,
+        responses_str=responses_str
+    )
     return handler_code, class_name
 
 def generate_interaction_model(intent_samples):
@@ -165,33 +166,8 @@ def generate_interaction_model(intent_samples):
 
     return interaction_model
 
-def main():
-    print("=== 生成完整的Alexa Handlers ===")
-
-    # 加载数据
-    intent_df = load_intent_mapping()
-    if intent_df is None:
-        return
-
-    # 提取意图响应和示例话语
-    intent_responses = extract_intent_responses(intent_df)
-    intent_samples = extract_sample_utterances(intent_df)
-
-    print(f"找到 {len(intent_responses)} 个意图")
-
-    # 生成Lambda函数代码
-    print("生成Lambda函数处理器...")
-
-    handler_classes = []
-    handler_registrations = []
-
-    for intent_name, responses in intent_responses.items():
-        handler_code, class_name = generate_handler_class(intent_name, responses)
-        handler_classes.append(handler_code)
-        handler_registrations.append(f"sb.add_request_handler({class_name}())")
-
-    # 生成完整的Lambda函数文件
-    lambda_template = '''# -*- coding: utf-8 -*-
+# 生成的Lambda函数文件的静态部分，处理器类和注册语句在两段之间流式写入
+LAMBDA_PREFIX = '''# -*- coding: utf-8 -*-
 
 # Romeo & Juliet RAG Question-Answering System - Complete Alexa Skills Kit Integration
 # Auto-generated from intent_mapping.csv
@@ -211,6 +187,14 @@ from ask_sdk_model import Response
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Follow-up prompts shared by every generated intent handler
+FOLLOW_UP_ASK_VARIATIONS = (
+    'Would you like to know more about Romeo and Juliet?',
+    "What else would you like to explore about the play?",
+    "Is there another aspect of Romeo and Juliet you'd like to discuss?",
+    "Any other questions about the story?"
+)
+
 class LaunchRequestHandler(AbstractRequestHandler):
     """Handler for Skill Launch."""
     def can_handle(self, handler_input):
@@ -325,7 +309,9 @@ class SessionEndedRequestHandler(AbstractRequestHandler):
 
 # Romeo & Juliet Specific Intent Handlers (Auto-generated)
 
-{handler_classes}
+'''
+
+LAMBDA_MIDDLE = '''
 
 class IntentReflectorHandler(AbstractRequestHandler):
     """The intent reflector for debugging."""
@@ -334,7 +320,7 @@ class IntentReflectorHandler(AbstractRequestHandler):
 
     def handle(self, handler_input):
         intent_name = ask_utils.get_intent_name(handler_input)
-        speak_output = f"You just triggered the {{intent_name}} intent."
+        speak_output = f"You just triggered the {intent_name} intent."
 
         return (
             handler_input.response_builder
@@ -369,26 +355,63 @@ sb.add_request_handler(FallbackIntentHandler())
 sb.add_request_handler(SessionEndedRequestHandler())
 
 # Auto-generated Romeo & Juliet specific handlers
-{handler_registrations}
+'''
+
+LAMBDA_SUFFIX = '''
 
 sb.add_request_handler(IntentReflectorHandler()) # make sure IntentReflectorHandler is last
 sb.add_exception_handler(CatchAllExceptionHandler())
 
 lambda_handler = sb.lambda_handler()'''
 
-    # 组装完整代码
-    all_handlers = '\n\n'.join(handler_classes)
-    all_registrations = '\n'.join(handler_registrations)
+def write_json(data, output_file):
+    """以2空格缩进写出JSON；安装了orjson时用它序列化，否则回退到标准库json"""
+    try:
+        import orjson
+    except ImportError:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return
 
-    complete_lambda = lambda_template.format(
-        handler_classes=all_handlers,
-        handler_registrations=all_registrations
-    )
+    with open(output_file, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+def main():
+    print("=== 生成完整的Alexa Handlers ===")
+
+    # 加载数据
+    intent_df = load_intent_mapping()
+    if intent_df is None:
+        return
+
+    # 提取意图响应和示例话语
+    intent_responses = extract_intent_responses(intent_df)
+    intent_samples = extract_sample_utterances(intent_df)
+
+    print(f"找到 {len(intent_responses)} 个意图")
+
+    # 生成Lambda函数代码
+    print("生成Lambda函数处理器...")
+
+    handler_classes = []
+    handler_registrations = []
+
+    for intent_name, responses in intent_responses.items():
+        handler_code, class_name = generate_handler_class(intent_name, responses)
+        handler_classes.append(handler_code)
+        handler_registrations.append(f"sb.add_request_handler({class_name}())")
 
-    # 保存Lambda函数
+    # 直接流式写入Lambda函数文件，不在内存中拼接完整源码
     lambda_output = 'src/intent-based/lambda/lambda_function_complete.py'
-    with open(lambda_output, 'w', encoding='utf-8') as f:
-        f.write(complete_lambda)
+    with open(lambda_output, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(LAMBDA_PREFIX)
+        for i, handler_code in enumerate(handler_classes):
+            if i:
+                f.write('\n\n')
+            f.write(handler_code)
+        f.write(LAMBDA_MIDDLE)
+        f.write('\n'.join(handler_registrations))
+        f.write(LAMBDA_SUFFIX)
 
     # 生成交互模型
     print("生成交互模型...")
@@ -396,8 +419,7 @@ lambda_handler = sb.lambda_handler()'''
 
     # 保存交互模型
     model_output = 'src/intent-based/interactionModels/custom/en-US-complete.json'
-    with open(model_output, 'w', encoding='utf-8') as f:
-        json.dump(interaction_model, f, indent=2, ensure_ascii=False)
+    write_json(interaction_model, model_output)
 
     print(f"\n生成完成！")
     print(f"Lambda函数文件: {lambda_output}")
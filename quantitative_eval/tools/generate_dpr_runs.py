@@ -5,6 +5,8 @@
 
 import os
 import sys
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 
 # 添加路径
@@ -12,26 +14,35 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from core.dpr_faiss_retrieval import DPRFAISSRetriever
 
-def generate_dpr_run(output_path: str = "target/runs/romeo-juliet-dpr.txt"):
-    """使用DPR生成runs文件"""
-    print("=== 生成DPR检索结果 ===")
+@lru_cache(maxsize=1)
+def get_dpr_retriever(index_path: str = "target/indexes/faiss_dpr"):
+    """加载DPR模型和索引；同一进程内重复调用直接复用已加载的检索器"""
+    # 让快速分词器并行分词（用户已设置时不覆盖）；torch的CPU线程数保持默认，
+    # 默认即按物理核心数并遵循OMP_NUM_THREADS
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "true")
 
     # 初始化DPR检索器
     retriever = DPRFAISSRetriever()
 
     # 加载索引
     print("加载DPR索引...")
-    retriever.load_index("target/indexes/faiss_dpr")
+    retriever.load_index(index_path)
+    return retriever
 
-    # 读取查询
-    topics_df = pd.read_csv("data/topics.csv")
+def generate_dpr_run(output_path: str = "target/runs/romeo-juliet-dpr.txt", retriever=None):
+    """使用DPR生成runs文件，可传入已加载的检索器以跳过模型和索引加载"""
+    print("=== 生成DPR检索结果 ===")
 
-    results = []
+    if retriever is None:
+        retriever = get_dpr_retriever()
+
+    # 读取查询
+    topics_df = pd.read_csv("data/topics.csv", usecols=['question_id', 'question'],
+                            dtype={'question_id': str, 'question': str})
 
-    for idx, row in topics_df.iterrows():
-        query_id = row['question_id']
-        question = row['question']
+    answered_ids, run_passage_ids, run_scores, lengths = [], [], [], []
 
+    for idx, (query_id, question) in enumerate(topics_df[['question_id', 'question']].itertuples(index=False, name=None)):
         if (idx + 1) % 20 == 0:
             print(f"处理查询: {idx+1}/{len(topics_df)}")
 
@@ -39,18 +50,31 @@ def generate_dpr_run(output_path: str = "target/runs/romeo-juliet-dpr.txt"):
             # 使用DPR检索
             passages, scores, passage_ids = retriever.search(question, k=4)
 
-            # 生成TREC格式结果
-            for rank, (passage_id, score) in enumerate(zip(passage_ids, scores), 1):
-                results.append(f"{query_id} Q0 {passage_id} {rank} {score:.6f} romeo-juliet.dpr")
+            # 只记录每个查询的结果，TREC各列在循环结束后整体构造
+            answered_ids.append(query_id)
+            run_passage_ids.extend(passage_ids)
+            run_scores.extend(scores)
+            lengths.append(len(passage_ids))
 
         except Exception as e:
             print(f"处理查询 {query_id} 时出错: {e}")
             continue
 
-    # 保存结果
+    # 查询ID和排名按每个查询的结果数用numpy一次展开
+    lengths = np.array(lengths, dtype=np.int64)
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    # 保存结果（TREC格式，由pandas的C写入器一次输出）
+    results = pd.DataFrame({
+        "query_id": np.repeat(np.array(answered_ids, dtype=object), lengths),
+        "Q0": "Q0",
+        "passage_id": run_passage_ids,
+        "rank": np.arange(lengths.sum()) - offsets + 1,
+        "score": run_scores,
+        "run_name": "romeo-juliet.dpr"
+    })
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(results))
+    results.to_csv(output_path, sep=' ', header=False, index=False, float_format='%.6f', lineterminator='\n')
 
     print(f"DPR检索结果保存到: {output_path}")
     print(f"生成了 {len(results)} 条结果")
@@ -5,12 +5,15 @@ Generate runs file using groundtruth-based retrieval system
 
 import os
 import sys
+import numpy as np
 import pandas as pd
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from core.groundtruth_based_retrieval import GroundtruthBasedRetriever
 
+QUESTION_TYPES = ("Known", "Inferred", "Out-of-KB")
+
 
 def generate_groundtruth_runs(output_path: str = "target/runs/romeo-juliet-groundtruth.txt"):
     """Generate runs file using groundtruth-based retrieval"""
@@ -23,40 +26,56 @@ def generate_groundtruth_runs(output_path: str = "target/runs/romeo-juliet-groun
     retriever = GroundtruthBasedRetriever()
 
     # Read queries
-    topics_df = pd.read_csv("data/topics.csv")
-
-    results = []
-    type_stats = {"Known": 0, "Inferred": 0, "Out-of-KB": 0}
+    topics_df = pd.read_csv("data/topics.csv", usecols=['question_id', 'question'],
+                            dtype={'question_id': str, 'question': str})
 
     print(f"\nProcessing {len(topics_df)} queries...")
 
-    for idx, row in topics_df.iterrows():
-        query_id = row['question_id']
-        question = row['question']
-
-        if (idx + 1) % 50 == 0:
-            print(f"  Processing: {idx+1}/{len(topics_df)}")
-
-        try:
-            # Use groundtruth-based retrieval
-            passages, scores, passage_ids, qtype = retriever.search(question, k=4, debug=False)
-
-            # Record statistics
-            type_stats[qtype] += 1
-
-            # Generate TREC format results
-            if qtype != "Out-of-KB" and len(passage_ids) > 0:
-                for rank, (passage_id, score) in enumerate(zip(passage_ids, scores), 1):
-                    results.append(f"{query_id} Q0 {passage_id} {rank} {score:.6f} romeo-juliet.groundtruth")
-
-        except Exception as e:
-            print(f"  Error processing query {query_id}: {e}")
-            continue
-
-    # Save results
+    # Match all queries in one batched encode + similarity pass
+    questions = topics_df['question'].tolist()
+    query_ids = topics_df['question_id'].to_numpy()
+    try:
+        search_results = retriever.search_batch(questions, k=4)
+    except Exception as e:
+        # Fall back to one query at a time so a failing query only drops itself
+        print(f"  Batch search failed ({e}), retrying queries one at a time")
+        search_results, kept_ids = [], []
+        for query_id, question in zip(query_ids, questions):
+            try:
+                search_results.append(retriever.search(question, k=4, debug=False))
+            except Exception as e:
+                print(f"  Error processing query {query_id}: {e}")
+                continue
+            kept_ids.append(query_id)
+        query_ids = np.array(kept_ids, dtype=object)
+
+    # Record statistics with one histogram over the encoded question types
+    qtypes = [qtype for _, _, _, qtype in search_results]
+    type_codes = pd.Categorical(qtypes, categories=QUESTION_TYPES).codes
+    is_known_type = type_codes >= 0
+    counts = np.bincount(type_codes[is_known_type], minlength=len(QUESTION_TYPES))
+    type_stats = dict(zip(QUESTION_TYPES, counts.tolist()))
+    for query_id, qtype in zip(query_ids, qtypes):
+        if qtype not in type_stats:
+            print(f"  Error processing query {query_id}: unexpected question type {qtype!r}")
+
+    # Generate TREC format results: only answered queries contribute rows
+    lengths = np.array([len(passage_ids) for _, _, passage_ids, _ in search_results], dtype=np.int64)
+    lengths[~is_known_type | (type_codes == QUESTION_TYPES.index("Out-of-KB"))] = 0
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    answered = [result for result, length in zip(search_results, lengths) if length]
+
+    # Save results in TREC format with pandas' C writer
+    results = pd.DataFrame({
+        "query_id": np.repeat(query_ids, lengths),
+        "Q0": "Q0",
+        "passage_id": [pid for _, _, passage_ids, _ in answered for pid in passage_ids],
+        "rank": np.arange(lengths.sum()) - offsets + 1,
+        "score": [score for _, scores, _, _ in answered for score in scores],
+        "run_name": "romeo-juliet.groundtruth"
+    })
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(results))
+    results.to_csv(output_path, sep=' ', header=False, index=False, float_format='%.6f', lineterminator='\n')
 
     print(f"\n✅ Groundtruth-based retrieval results saved to: {output_path}")
     print(f"Generated {len(results)} results")
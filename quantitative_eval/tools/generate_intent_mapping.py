@@ -4,20 +4,18 @@
 基于现有的topics.csv, groundtruth.csv和gold_summaries.csv生成意图映射
 """
 
+import csv
 import pandas as pd
 import json
 import re
+from collections import Counter
 
-def create_intent_name(topic):
-    """
-    基于topic内容生成意图名称
-    例如: "What metaphor does Romeo use..." -> "Romeo_Metaphor_Juliet"
-    """
-    # 提取关键词来生成意图名
-    topic_lower = topic.lower()
+INTENT_MAPPING_COLUMNS = ['topic_id', 'topic', 'question_id', 'question', 'intent', 'passage_hardcoded']
 
-    # 定义意图映射规则
-    intent_mapping = {
+# 定义意图映射规则（按顺序匹配，模块加载时一次性编译）
+INTENT_PATTERNS = [
+    (re.compile(pattern), intent_name)
+    for pattern, intent_name in {
         'metaphor.*romeo.*juliet': 'Romeo_Metaphor_Juliet',
         'request.*juliet.*romeo.*identity': 'Juliet_Name_Request',
         'friar.*laurence.*agree.*marry': 'Friar_Marriage_Reason',
@@ -38,16 +36,27 @@ def create_intent_name(topic):
         'death.*tragic.*ending': 'Death_Tragic_Ending',
         'fate.*destiny.*theme': 'Fate_Destiny_Theme',
         'youth.*age.*conflict': 'Youth_Age_Conflict'
-    }
+    }.items()
+]
+
+CAPITALIZED_WORD_RE = re.compile(r'\b[A-Z][a-z]+\b')
+
+def create_intent_name(topic):
+    """
+    基于topic内容生成意图名称
+    例如: "What metaphor does Romeo use..." -> "Romeo_Metaphor_Juliet"
+    """
+    # 提取关键词来生成意图名
+    topic_lower = topic.lower()
 
     # 尝试匹配意图模式
-    for pattern, intent_name in intent_mapping.items():
-        if re.search(pattern, topic_lower):
+    for pattern, intent_name in INTENT_PATTERNS:
+        if pattern.search(topic_lower):
             return intent_name
 
     # 如果没有匹配到，生成通用意图名
     # 提取主要角色和动作
-    words = re.findall(r'\b[A-Z][a-z]+\b', topic)
+    words = CAPITALIZED_WORD_RE.findall(topic)
     if len(words) >= 2:
         return f"{words[0]}_{words[1]}_Question"
     elif len(words) == 1:
@@ -60,49 +69,48 @@ def load_gold_summaries():
     try:
         gold_summaries = pd.read_csv('data/gold_summaries.csv')
         # 创建question_id到answer的映射 (从question_id提取topic_id)
+        # 用dict做有序去重，避免在列表中线性查找重复答案
         summary_dict = {}
-        for _, row in gold_summaries.iterrows():
-            question_id = row['question_id']
+        for question_id, answer in gold_summaries[['question_id', 'summary']].itertuples(index=False, name=None):
             topic_id = question_id[:3]  # W01Q01 -> W01
-            answer = row['summary']
-            if topic_id not in summary_dict:
-                summary_dict[topic_id] = []
-            if answer not in summary_dict[topic_id]:  # 避免重复
-                summary_dict[topic_id].append(answer)
-        return summary_dict
+            summary_dict.setdefault(topic_id, {})[answer] = None
+        return {topic_id: list(answers) for topic_id, answers in summary_dict.items()}
     except FileNotFoundError:
         print("Warning: gold_summaries.csv not found, will use placeholder answers")
         return {}
 
-def generate_passage_hardcoded(topic_id, gold_summaries):
+# 没有金标准答案时使用的通用回答（模块加载时序列化一次）
+GENERIC_PASSAGE_HARDCODED = json.dumps([
+    "Based on Romeo and Juliet, I can provide information about this topic.",
+    "In Shakespeare's play, this is an important element of the story.",
+    "According to the text, this plays a significant role in the narrative.",
+    "From Romeo and Juliet, this contributes to the tragic tale.",
+    "In the play, this aspect helps develop the characters and plot."
+])
+
+# 基于金标准答案生成回答变体时使用的前缀
+ANSWER_PREFIXES = (
+    "Based on Romeo and Juliet: ",
+    "In Shakespeare's play: ",
+    "According to the text: ",
+    "From Romeo and Juliet: ",
+    "In the play: "
+)
+
+def build_passage_hardcoded(gold_summaries):
     """
-    生成passage_hardcoded字段
-    这个字段包含该意图的预设回答变体
+    预先为每个有金标准答案的topic生成passage_hardcoded字段
+    这个字段包含该意图的预设回答变体（取第一个答案），每个topic只序列化一次
     """
-    if topic_id in gold_summaries:
-        # 使用金标准答案
-        answers = gold_summaries[topic_id]
-        # 基于答案生成多个变体
-        variations = []
-        for answer in answers[:1]:  # 取第一个答案
-            variations.extend([
-                f"Based on Romeo and Juliet: {answer}",
-                f"In Shakespeare's play: {answer}",
-                f"According to the text: {answer}",
-                f"From Romeo and Juliet: {answer}",
-                f"In the play: {answer}"
-            ])
-        return json.dumps(variations[:5])  # 返回前5个变体
-    else:
-        # 生成通用回答
-        generic_answers = [
-            "Based on Romeo and Juliet, I can provide information about this topic.",
-            "In Shakespeare's play, this is an important element of the story.",
-            "According to the text, this plays a significant role in the narrative.",
-            "From Romeo and Juliet, this contributes to the tragic tale.",
-            "In the play, this aspect helps develop the characters and plot."
-        ]
-        return json.dumps(generic_answers)
+    return {
+        topic_id: json.dumps([f"{prefix}{answers[0]}" for prefix in ANSWER_PREFIXES])
+        for topic_id, answers in gold_summaries.items()
+        if answers
+    }
+
+def generate_passage_hardcoded(topic_id, passage_hardcoded):
+    """获取topic的passage_hardcoded字段，没有金标准答案时返回通用回答"""
+    return passage_hardcoded.get(topic_id, GENERIC_PASSAGE_HARDCODED)
 
 def main():
     print("=== 生成Romeo & Juliet Intent Mapping ===")
@@ -113,61 +121,55 @@ def main():
 
     print("加载金标准答案...")
     gold_summaries = load_gold_summaries()
+    passage_hardcoded_by_topic = build_passage_hardcoded(gold_summaries)
 
-    # 创建intent mapping
+    # 创建intent mapping并逐行写入CSV
     print("生成意图映射...")
-    intent_mapping_data = []
+    output_file = 'data/intent_mapping.csv'
+    total_records = 0
+    topic_ids = set()
+    intent_counts = Counter()
+    sample_record = None
 
-    # 获取唯一的topics
+    # 每个唯一topic只生成一次意图名称和预设答案，再通过hash join关联到所有question变体
     unique_topics = topics_df.drop_duplicates(['topic_id', 'topic'])
-
-    for _, topic_row in unique_topics.iterrows():
-        topic_id = topic_row['topic_id']
-        topic = topic_row['topic']
-
-        # 获取该topic的所有question变体
-        topic_questions = topics_df[topics_df['topic_id'] == topic_id]
-
-        # 生成意图名称
-        intent_name = create_intent_name(topic)
-
-        # 生成预设答案
-        passage_hardcoded = generate_passage_hardcoded(topic_id, gold_summaries)
-
-        # 为每个question变体创建记录
-        for _, question_row in topic_questions.iterrows():
-            record = {
-                'topic_id': question_row['topic_id'],
-                'topic': question_row['topic'],
-                'question_id': question_row['question_id'],
-                'question': question_row['question'],
-                'intent': intent_name,
-                'passage_hardcoded': passage_hardcoded
-            }
-            intent_mapping_data.append(record)
-
-    # 创建DataFrame
-    intent_mapping_df = pd.DataFrame(intent_mapping_data)
-
-    # 保存文件
-    output_file = 'data/intent_mapping.csv'
-    intent_mapping_df.to_csv(output_file, index=False)
+    topic_intents = pd.DataFrame({
+        'topic_id': unique_topics['topic_id'],
+        'intent': unique_topics['topic'].map(create_intent_name),
+        'passage_hardcoded': [generate_passage_hardcoded(topic_id, passage_hardcoded_by_topic)
+                              for topic_id in unique_topics['topic_id']]
+    })
+    intent_mapping_df = topic_intents.merge(
+        topics_df[['topic_id', 'topic', 'question_id', 'question']], on='topic_id', how='inner'
+    )[INTENT_MAPPING_COLUMNS]
+
+    with open(output_file, 'w', encoding='utf-8', newline='', buffering=1 << 20) as f:
+        writer = csv.DictWriter(f, fieldnames=INTENT_MAPPING_COLUMNS, lineterminator='\n')
+        writer.writeheader()
+
+        for row in intent_mapping_df.itertuples(index=False, name=None):
+            record = dict(zip(INTENT_MAPPING_COLUMNS, row))
+            writer.writerow(record)
+
+            total_records += 1
+            topic_ids.add(record['topic_id'])
+            intent_counts[record['intent']] += 1
+            if sample_record is None:
+                sample_record = record
 
     print(f"\n生成完成！")
     print(f"输出文件: {output_file}")
-    print(f"总记录数: {len(intent_mapping_df)}")
-    print(f"唯一topic数: {intent_mapping_df['topic_id'].nunique()}")
-    print(f"唯一intent数: {intent_mapping_df['intent'].nunique()}")
+    print(f"总记录数: {total_records}")
+    print(f"唯一topic数: {len(topic_ids)}")
+    print(f"唯一intent数: {len(intent_counts)}")
 
     # 显示意图统计
     print(f"\n意图分布:")
-    intent_counts = intent_mapping_df['intent'].value_counts()
-    for intent, count in intent_counts.head(10).items():
+    for intent, count in intent_counts.most_common(10):
         print(f"  {intent}: {count}个问题")
 
     # 显示示例记录
     print(f"\n示例记录:")
-    sample_record = intent_mapping_df.iloc[0]
     for col, val in sample_record.items():
         if col == 'passage_hardcoded':
             val = str(val)[:100] + "..." if len(str(val)) > 100 else val
@@ -5,29 +5,38 @@
 """
 
 import pandas as pd
-import random
 import numpy as np
 
-def simulate_intent_recognition(question, expected_intent, accuracy_rate=0.85):
+# 模拟识别错误时的常见错误意图
+COMMON_MISTAKES = np.array([
+    "AMAZON.FallbackIntent",  # 最常见的错误是识别为回退意图
+    "General_Question",
+    "What_Romeo_Question",
+    "What_Juliet_Question",
+    "What_Friar_Question"
+])
+
+# 核心经典意图准确率更高
+CORE_INTENTS = ['Romeo_Metaphor_Juliet', 'Juliet_Name_Request', 'Friar_Marriage_Reason']
+
+def simulate_intent_recognition(expected_intents, accuracy_rates, rng):
     """
-    模拟意图识别系统的表现
-    大多数情况下识别正确，但有一定错误率
+    批量模拟意图识别系统的表现
+    大多数情况下识别正确，但有一定错误率；一次性抽取所有随机数
     """
-    if random.random() < accuracy_rate:
-        return expected_intent
-    else:
-        # 模拟识别错误的情况
-        common_mistakes = [
-            "AMAZON.FallbackIntent",  # 最常见的错误是识别为回退意图
-            "General_Question",
-            "What_Romeo_Question",
-            "What_Juliet_Question",
-            "What_Friar_Question"
-        ]
-
-        # 排除正确答案
-        possible_mistakes = [intent for intent in common_mistakes if intent != expected_intent]
-        return random.choice(possible_mistakes)
+    expected_intents = np.asarray(expected_intents, dtype=object)
+    correct_mask = rng.random(len(expected_intents)) < accuracy_rates
+
+    # 从排除正确答案后的错误意图中均匀抽取：
+    # 若正确答案本身在错误列表中，则少抽一个位置，并跳过它所在的下标
+    match_matrix = expected_intents[:, None] == COMMON_MISTAKES[None, :]
+    is_mistake_intent = match_matrix.any(axis=1)
+    expected_position = match_matrix.argmax(axis=1)
+    num_options = len(COMMON_MISTAKES) - is_mistake_intent
+    mistake_idx = (rng.random(len(expected_intents)) * num_options).astype(int)
+    mistake_idx += is_mistake_intent & (mistake_idx >= expected_position)
+
+    return np.where(correct_mask, expected_intents, COMMON_MISTAKES[mistake_idx])
 
 def main():
     print("=== 生成Romeo & Juliet Intent Results ===")
@@ -37,53 +46,38 @@ def main():
     intent_mapping = pd.read_csv('data/intent_mapping.csv')
 
     # 设置随机种子以保证结果可重现
-    random.seed(42)
-    np.random.seed(42)
-
-    # 创建评估数据
-    results_data = []
+    rng = np.random.default_rng(42)
 
     # 获取唯一的问题（每个问题只评估一次）
     unique_questions = intent_mapping.drop_duplicates(['question_id'])
+    expected = unique_questions['intent']
 
     print("模拟意图识别评估...")
 
-    for _, row in unique_questions.iterrows():
-        question = row['question']
-        expected_intent = row['intent']
-
-        # 模拟意图识别结果
-        # 对于不同类型的意图设置不同的准确率
-        if expected_intent in ['Romeo_Metaphor_Juliet', 'Juliet_Name_Request', 'Friar_Marriage_Reason']:
-            # 核心经典意图准确率更高
-            accuracy = 0.90
-        elif 'Question' in expected_intent:
-            # 通用问题类型准确率稍低
-            accuracy = 0.75
-        else:
-            # 其他意图
-            accuracy = 0.85
-
-        actual_intent = simulate_intent_recognition(question, expected_intent, accuracy)
-
-        # 创建评估记录
-        result_record = {
-            'question': question,
-            'actual': actual_intent,
-            'expected': expected_intent
-        }
-        results_data.append(result_record)
-
-    # 创建DataFrame
-    results_df = pd.DataFrame(results_data)
+    # 对于不同类型的意图设置不同的准确率：
+    # 核心经典意图0.90，通用问题类型0.75，其他意图0.85
+    accuracy_rates = np.where(
+        expected.isin(CORE_INTENTS), 0.90,
+        np.where(expected.str.contains('Question', regex=False), 0.75, 0.85)
+    )
+
+    # 一次性构建评估数据
+    results_df = pd.DataFrame({
+        'question': unique_questions['question'].to_numpy(),
+        'actual': simulate_intent_recognition(expected.to_numpy(), accuracy_rates, rng),
+        'expected': expected.to_numpy()
+    })
 
     # 保存文件
     output_file = 'data/romeo_juliet_intent_results.csv'
-    results_df.to_csv(output_file, index=False)
+    with open(output_file, 'w', encoding='utf-8', newline='', buffering=1 << 20) as f:
+        results_df.to_csv(f, index=False, lineterminator='\n')
 
     # 计算统计信息
     total_questions = len(results_df)
-    correct_predictions = (results_df['actual'] == results_df['expected']).sum()
+    is_correct = pd.Series(results_df['actual'].to_numpy() == results_df['expected'].to_numpy(),
+                           index=results_df.index)
+    correct_predictions = is_correct.sum()
     accuracy = correct_predictions / total_questions
 
     print(f"\n生成完成！")
@@ -94,7 +88,7 @@ def main():
 
     # 分析错误类型
     print(f"\n错误分析:")
-    incorrect_df = results_df[results_df['actual'] != results_df['expected']]
+    incorrect_df = results_df[~is_correct]
 
     if len(incorrect_df) > 0:
         print(f"错误识别数: {len(incorrect_df)}")
@@ -105,9 +99,7 @@ def main():
 
     # 按意图类型分析准确率
     print(f"\n按意图类型的准确率:")
-    intent_accuracy = results_df.groupby('expected').apply(
-        lambda x: (x['actual'] == x['expected']).mean()
-    ).sort_values(ascending=False)
+    intent_accuracy = is_correct.groupby(results_df['expected']).mean().sort_values(ascending=False)
 
     for intent, acc in intent_accuracy.head(10).items():
         print(f"  {intent}: {acc:.1%}")
@@ -116,7 +108,7 @@ def main():
     print(f"\n示例记录:")
     sample_records = results_df.head(3)
     for i, record in sample_records.iterrows():
-        status = "✓" if record['actual'] == record['expected'] else "✗"
+        status = "✓" if is_correct[i] else "✗"
         print(f"  {status} 问题: {record['question'][:60]}...")
         print(f"    期望: {record['expected']}")
         print(f"    实际: {record['actual']}")
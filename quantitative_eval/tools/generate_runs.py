@@ -6,7 +6,9 @@
 
 import os
 import sys
+import numpy as np
 import pandas as pd
+from functools import lru_cache
 from typing import List, Dict, Tuple
 
 # 添加path以导入我们的模块
@@ -15,50 +17,111 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from core.modern_rag_system import ModernRAGSystem
 from pyserini.search.lucene import LuceneSearcher
 
-def generate_faiss_run(output_path: str = "target/runs/romeo-juliet-faiss.txt"):
+def search_all(retriever, query_ids: List[str], questions: List[str], k: int = 4) -> List[Tuple[str, List[str], List[float]]]:
     """
-    使用FAISS检索器生成runs文件
+    检索所有问题，返回每个问题的(query_id, passage_ids, scores)
+
+    检索器提供search_batch时，编码器和FAISS各只调用一次，批量检索失败直接抛出；
+    否则逐条调用search，出错的查询打印后跳过。
+    两种接口的结果都以(passages, scores, passage_ids, ...)开头，其余字段忽略
     """
-    print("=== 生成FAISS检索结果 ===")
+    search_batch = getattr(retriever, "search_batch", None)
+    if search_batch is not None:
+        return [(query_id, result[2], result[1])
+                for query_id, result in zip(query_ids, search_batch(questions, k=k))]
+
+    query_results = []
+    for query_id, question in zip(query_ids, questions):
+        try:
+            result = retriever.search(question, k=k)
+        except Exception as e:
+            print(f"处理查询 {query_id} 时出错: {e}")
+            continue
+        query_results.append((query_id, result[2], result[1]))
+    return query_results
+
+def build_trec_run(query_results: List[Tuple[str, List[str], List[float]]], run_name: str) -> pd.DataFrame:
+    """
+    把每个查询的(query_id, passage_ids, scores)展开为TREC格式的DataFrame
+
+    查询ID与排名按每个查询的结果数用numpy一次展开，写出时由pandas的C写入器格式化
+    """
+    lengths = np.fromiter((len(passage_ids) for _, passage_ids, _ in query_results),
+                          dtype=np.int64, count=len(query_results))
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    return pd.DataFrame({
+        "query_id": np.repeat(np.array([query_id for query_id, _, _ in query_results], dtype=object), lengths),
+        "Q0": "Q0",
+        "passage_id": [pid for _, passage_ids, _ in query_results for pid in passage_ids],
+        "rank": np.arange(lengths.sum()) - offsets + 1,
+        "score": [score for _, _, scores in query_results for score in scores],
+        "run_name": run_name
+    })
+
+def save_trec_run(results: pd.DataFrame, output_path: str):
+    """以TREC格式保存runs文件，整份结果经1MB缓冲一次写出"""
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8', newline='', buffering=1 << 20) as f:
+        results.to_csv(f, sep=' ', header=False, index=False, float_format='%.6f', lineterminator='\n')
+
+@lru_cache(maxsize=1)
+def load_topics() -> pd.DataFrame:
+    """读取查询，三个生成器共用一次解析结果，只加载用到的两列"""
+    return pd.read_csv("data/topics.csv", usecols=['question_id', 'question'],
+                       dtype={'question_id': str, 'question': str})
 
+@lru_cache(maxsize=1)
+def get_rag_system() -> ModernRAGSystem:
+    """
+    FAISS与意图runs共用的RAG系统，编码模型和FAISS索引在进程内只加载一次
+
+    两种runs都只使用其中的FAISS检索器，生成方式不影响检索结果
+    """
+    return ModernRAGSystem(retrieval_method="faiss", generation_method="simple")
+
+def retrieve_faiss_results(rag_system=None) -> List[Tuple[str, List[str], List[float]]]:
+    """
+    用FAISS检索器检索所有查询，每个topic对应4个相关段落
+
+    FAISS与意图runs的检索完全相同，main中只检索一次，两个文件共用结果
+    """
     # 初始化RAG系统
-    rag_system = ModernRAGSystem(retrieval_method="faiss", generation_method="simple")
+    if rag_system is None:
+        rag_system = get_rag_system()
 
     # 读取查询
-    topics_df = pd.read_csv("data/topics.csv")
+    topics_df = load_topics()
 
-    results = []
+    print(f"批量处理 {len(topics_df)} 个查询...")
+    return search_all(rag_system.retriever, topics_df['question_id'].tolist(),
+                      topics_df['question'].tolist(), k=4)
 
-    for _, row in topics_df.iterrows():
-        query_id = row['question_id']
-        question = row['question']
+def generate_faiss_run(output_path: str = "target/runs/romeo-juliet-faiss.txt", rag_system=None,
+                       query_results=None):
+    """
+    使用FAISS检索器生成runs文件，返回写入的结果条数
 
-        print(f"处理查询: {query_id} - {question[:50]}...")
+    query_results为retrieve_faiss_results的结果，未提供时在此检索
+    """
+    print("=== 生成FAISS检索结果 ===")
 
-        try:
-            # 使用FAISS检索，每个topic对应4个相关段落
-            faiss_results = rag_system.retriever.search(question, k=4)
-            passages, scores, passage_ids = faiss_results
+    if query_results is None:
+        query_results = retrieve_faiss_results(rag_system)
 
-            # 生成TREC格式结果
-            for rank, (passage_id, score) in enumerate(zip(passage_ids, scores), 1):
-                results.append(f"{query_id} Q0 {passage_id} {rank} {score:.6f} romeo-juliet.faiss")
-
-        except Exception as e:
-            print(f"处理查询 {query_id} 时出错: {e}")
-            continue
+    # 生成TREC格式结果
+    results = build_trec_run(query_results, "romeo-juliet.faiss")
 
     # 保存结果
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(results))
+    save_trec_run(results, output_path)
 
     print(f"FAISS检索结果保存到: {output_path}")
     print(f"生成了 {len(results)} 条结果")
+    return len(results)
 
 def generate_bm25_run(output_path: str = "target/runs/romeo-juliet-bm25.txt"):
     """
-    使用BM25检索器生成runs文件
+    使用BM25检索器生成runs文件，返回写入的结果条数
     """
     print("=== 生成BM25检索结果 ===")
 
@@ -73,82 +136,64 @@ def generate_bm25_run(output_path: str = "target/runs/romeo-juliet-bm25.txt"):
     searcher = LuceneSearcher(bm25_index_path)
 
     # 读取查询
-    topics_df = pd.read_csv("data/topics.csv")
-
-    results = []
+    topics_df = load_topics()
 
-    for _, row in topics_df.iterrows():
-        query_id = row['question_id']
-        question = row['question']
+    qids = topics_df['question_id'].astype(str).tolist()
 
-        print(f"处理查询: {query_id} - {question[:50]}...")
+    print(f"批量处理 {len(qids)} 个查询...")
 
-        try:
-            # 使用BM25检索，每个topic对应4个相关段落
-            hits = searcher.search(question, k=4)
-
-            # 生成TREC格式结果
-            for rank, hit in enumerate(hits, 1):
-                results.append(f"{query_id} Q0 {hit.docid} {rank} {hit.score:.6f} romeo-juliet.bm25")
+    try:
+        # 使用BM25批量检索（Lucene的Java线程池并行），每个topic对应4个相关段落
+        batch_hits = searcher.batch_search(topics_df['question'].tolist(), qids, k=4,
+                                           threads=os.cpu_count() or 1)
+    except Exception as e:
+        print(f"批量检索时出错: {e}")
+        batch_hits = {}
 
-        except Exception as e:
-            print(f"处理查询 {query_id} 时出错: {e}")
-            continue
+    # 按查询顺序收集TREC格式结果
+    query_results = []
+    for query_id in qids:
+        hits = batch_hits.get(query_id, [])
+        query_results.append((query_id, [hit.docid for hit in hits], [hit.score for hit in hits]))
 
-    # 保存结果
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(results))
+    # 生成并保存TREC格式结果
+    results = build_trec_run(query_results, "romeo-juliet.bm25")
+    save_trec_run(results, output_path)
 
     print(f"BM25检索结果保存到: {output_path}")
     print(f"生成了 {len(results)} 条结果")
+    return len(results)
 
-def generate_intent_run(output_path: str = "target/runs/romeo-juliet-intent.txt"):
+def generate_intent_run(output_path: str = "target/runs/romeo-juliet-intent.txt", rag_system=None,
+                        query_results=None):
     """
-    使用意图模式生成runs文件
+    使用意图模式生成runs文件，返回写入的结果条数
+
+    query_results为retrieve_faiss_results的结果，未提供时在此检索
     """
     print("=== 生成意图检索结果 ===")
 
-    # 初始化RAG系统（意图模式）
-    rag_system = ModernRAGSystem(retrieval_method="faiss", generation_method="intent")
-
-    # 读取查询和意图映射
-    topics_df = pd.read_csv("data/topics.csv")
+    # 读取意图映射
     try:
         intent_df = pd.read_csv("data/intent_mapping.csv")
     except FileNotFoundError:
         print("❌ 意图映射文件不存在，跳过意图runs生成")
         return
 
-    results = []
-
-    for _, row in topics_df.iterrows():
-        query_id = row['question_id']
-        question = row['question']
-
-        print(f"处理查询: {query_id} - {question[:50]}...")
-
-        try:
-            # 检查是否有对应的意图
-            # 这里简化处理，使用FAISS作为后备，每个topic对应4个相关段落
-            faiss_results = rag_system.retriever.search(question, k=4)
-            passages, scores, passage_ids = faiss_results
-
-            # 生成TREC格式结果
-            for rank, (passage_id, score) in enumerate(zip(passage_ids, scores), 1):
-                results.append(f"{query_id} Q0 {passage_id} {rank} {score:.6f} romeo-juliet.intent")
+    # 检查是否有对应的意图
+    # 这里简化处理，使用FAISS检索作为后备（与FAISS runs共用同一检索器）
+    if query_results is None:
+        query_results = retrieve_faiss_results(rag_system)
 
-        except Exception as e:
-            print(f"处理查询 {query_id} 时出错: {e}")
-            continue
+    # 生成TREC格式结果
+    results = build_trec_run(query_results, "romeo-juliet.intent")
 
     # 保存结果
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(results))
+    save_trec_run(results, output_path)
 
     print(f"意图检索结果保存到: {output_path}")
     print(f"生成了 {len(results)} 条结果")
+    return len(results)
 
 def main():
     """主函数"""
@@ -161,18 +206,25 @@ def main():
         return
 
     try:
-        # 生成FAISS runs
-        generate_faiss_run()
+        # FAISS和Intent runs的检索相同，只检索一次，两个文件共用结果
+        faiss_results = retrieve_faiss_results(get_rag_system())
+        faiss_count = generate_faiss_run(query_results=faiss_results)
         print()
 
-        # 生成BM25 runs
-        generate_bm25_run()
+        # BM25在主线程中运行：batch_search已在Java线程池中并行检索
+        bm25_count = generate_bm25_run()
         print()
 
-        # 生成Intent runs
-        generate_intent_run()
+        intent_count = generate_intent_run(query_results=faiss_results)
         print()
 
+        # 本次生成的文件直接使用写入时的条数，无需重新读取
+        run_counts = {
+            "romeo-juliet-faiss.txt": faiss_count,
+            "romeo-juliet-bm25.txt": bm25_count,
+            "romeo-juliet-intent.txt": intent_count
+        }
+
         print("✅ 所有runs文件生成完成！")
 
         # 显示统计信息
@@ -181,9 +233,12 @@ def main():
             print("\n📊 生成的runs文件:")
             for filename in os.listdir(runs_dir):
                 if filename.startswith("romeo-juliet"):
-                    filepath = os.path.join(runs_dir, filename)
-                    with open(filepath, 'r') as f:
-                        line_count = sum(1 for _ in f)
+                    line_count = run_counts.get(filename)
+                    if line_count is None:
+                        # 其他脚本生成或本次跳过的文件才需要逐行计数
+                        filepath = os.path.join(runs_dir, filename)
+                        with open(filepath, 'r') as f:
+                            line_count = sum(1 for _ in f)
                     print(f"  {filename}: {line_count} 条结果")
 
     except Exception as e:
@@ -178,19 +178,15 @@ def clear_old_summaries():
 
     print("=== 清理旧的RMIT summaries ===")
 
-    # 备份旧文件
+    # 备份旧文件：整个目录改名为备份目录，不复制文件内容
+    import shutil
     backup_dir = "target/summaries_backup_rmit"
-    if os.path.exists(summaries_dir):
-        import shutil
-        if os.path.exists(backup_dir):
-            shutil.rmtree(backup_dir)
-        shutil.copytree(summaries_dir, backup_dir)
-        print(f"旧文件已备份到: {backup_dir}")
+    if os.path.exists(backup_dir):
+        shutil.rmtree(backup_dir)
+    os.rename(summaries_dir, backup_dir)
+    print(f"旧文件已备份到: {backup_dir}")
 
-    # 清空目录
-    import shutil
-    if os.path.exists(summaries_dir):
-        shutil.rmtree(summaries_dir)
+    # 重建空目录
     os.makedirs(summaries_dir, exist_ok=True)
 
     print("旧summaries已清理")
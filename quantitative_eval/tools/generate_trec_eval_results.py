@@ -20,30 +20,33 @@ def run_trec_eval(qrels_file: str, runs_file: str, output_file: str):
     """
 
     try:
-        # 检查trec_eval程序是否存在
+        # 检查trec_eval程序是否存在（在创建结果文件之前）
         trec_eval_cmd = "trec_eval"
+        if shutil.which(trec_eval_cmd) is None:
+            raise FileNotFoundError(trec_eval_cmd)
 
         # 运行trec_eval命令
         cmd = [trec_eval_cmd, "-m", "all_trec", qrels_file, runs_file]
 
         print(f"运行命令: {' '.join(cmd)}")
 
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=os.getcwd()
-        )
+        # trec_eval的标准输出直接写入结果文件，不经过Python内存
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        with open(output_file, 'wb') as f:
+            result = subprocess.run(
+                cmd,
+                stdout=f,
+                stderr=subprocess.PIPE,
+                cwd=os.getcwd()
+            )
 
         if result.returncode == 0:
-            # 保存结果
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(result.stdout)
             print(f"评估结果保存到: {output_file}")
             return True
         else:
-            print(f"trec_eval执行失败: {result.stderr}")
+            # 执行失败时不保留不完整的结果文件
+            os.remove(output_file)
+            print(f"trec_eval执行失败: {result.stderr.decode('utf-8', errors='replace')}")
             return False
 
     except FileNotFoundError:
@@ -130,17 +133,14 @@ def clear_old_results():
 
     print("=== 清理旧的RMIT评估结果 ===")
 
-    # 备份旧文件
+    # 备份旧文件：整个目录改名为备份目录，不复制文件内容
     backup_dir = "target/trec_eval_results_backup_rmit"
-    if os.path.exists(results_dir):
-        if os.path.exists(backup_dir):
-            shutil.rmtree(backup_dir)
-        shutil.copytree(results_dir, backup_dir)
-        print(f"旧文件已备份到: {backup_dir}")
+    if os.path.exists(backup_dir):
+        shutil.rmtree(backup_dir)
+    os.rename(results_dir, backup_dir)
+    print(f"旧文件已备份到: {backup_dir}")
 
-    # 清空目录
-    if os.path.exists(results_dir):
-        shutil.rmtree(results_dir)
+    # 重建空目录
     os.makedirs(results_dir, exist_ok=True)
 
     print("旧评估结果已清理")
@@ -6,8 +6,8 @@
 
 import os
 import shutil
+import pandas as pd
 import pytrec_eval
-from collections import defaultdict
 
 def load_qrels(qrels_file: str):
     """
@@ -19,18 +19,18 @@ def load_qrels(qrels_file: str):
     Returns:
         dict: 查询相关性判断字典
     """
-    qrels = defaultdict(dict)
+    # 由pandas的C解析器一次读入，缺列的行丢弃；query_id读为category，分组时按整数编码进行
+    df = pd.read_csv(qrels_file, sep=r'\s+', header=None, engine='c',
+                     names=['query_id', 'iter', 'doc_id', 'relevance'],
+                     dtype={'query_id': 'category', 'iter': str, 'doc_id': str})
+    df = df.dropna(subset=['relevance'])
+    df['relevance'] = df['relevance'].astype('int8')
 
-    with open(qrels_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) >= 4:
-                query_id = parts[0]
-                doc_id = parts[2]
-                relevance = int(parts[3])
-                qrels[query_id][doc_id] = relevance
+    qrels = dict.fromkeys(df['query_id'].unique())
+    for query_id, group in df.groupby('query_id', sort=False, observed=True):
+        qrels[query_id] = dict(zip(group['doc_id'], group['relevance'].tolist()))
 
-    return dict(qrels)
+    return qrels
 
 def load_runs(runs_file: str):
     """
@@ -42,76 +42,76 @@ def load_runs(runs_file: str):
     Returns:
         dict: 检索结果字典
     """
-    runs = defaultdict(dict)
+    # 由pandas的C解析器一次读入，round_trip保证分数与float()解析结果一致
+    # query_id读为category，分组时按整数编码进行
+    df = pd.read_csv(runs_file, sep=r'\s+', header=None, engine='c',
+                     names=['query_id', 'Q0', 'doc_id', 'rank', 'score', 'run_name'],
+                     float_precision='round_trip',
+                     dtype={'query_id': 'category', 'Q0': str, 'doc_id': str, 'run_name': str})
+    df = df.dropna(subset=['run_name'])
 
-    with open(runs_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) >= 6:
-                query_id = parts[0]
-                doc_id = parts[2]
-                score = float(parts[4])
-                runs[query_id][doc_id] = score
+    runs = dict.fromkeys(df['query_id'].unique())
+    for query_id, group in df.groupby('query_id', sort=False, observed=True):
+        runs[query_id] = dict(zip(group['doc_id'], group['score'].astype('float64').tolist()))
 
-    return dict(runs)
+    return runs
 
-def run_pytrec_eval(qrels_file: str, runs_file: str, output_file: str):
+def create_evaluator(qrels_file: str):
     """
-    使用pytrec_eval进行评估
+    加载qrels并创建评估器，所有runs文件共用同一个评估器
 
     Args:
         qrels_file: 相关性判断文件路径
+
+    Returns:
+        pytrec_eval.RelevanceEvaluator: 评估器
+    """
+    print(f"加载qrels: {qrels_file}")
+    qrels = load_qrels(qrels_file)
+    print(f"查询数量: {len(qrels)}")
+
+    # 创建评估器 - 使用P@4和Recall@4更符合实际（每个topic对应4个段落）
+    return pytrec_eval.RelevanceEvaluator(
+        qrels,
+        {'map', 'ndcg', 'P_4', 'P_10', 'recall_4', 'recall_10', 'bpref'}
+    )
+
+def run_pytrec_eval(evaluator, runs_file: str, output_file: str):
+    """
+    使用pytrec_eval进行评估
+
+    Args:
+        evaluator: create_evaluator创建的评估器
         runs_file: 检索结果文件路径
         output_file: 输出结果文件路径
 
     Returns:
-        bool: 是否成功
+        dict: 各指标的总体平均值（与结果文件中相同的4位小数字符串），失败时为None
     """
     try:
-        print(f"加载qrels: {qrels_file}")
-        qrels = load_qrels(qrels_file)
-        print(f"查询数量: {len(qrels)}")
-
         print(f"加载runs: {runs_file}")
         runs = load_runs(runs_file)
         print(f"查询数量: {len(runs)}")
 
-        # 创建评估器 - 使用P@4和Recall@4更符合实际（每个topic对应4个段落）
-        evaluator = pytrec_eval.RelevanceEvaluator(
-            qrels,
-            {'map', 'ndcg', 'P_4', 'P_10', 'recall_4', 'recall_10', 'bpref'}
-        )
-
         # 运行评估
         results = evaluator.evaluate(runs)
 
-        # 格式化输出
-        output_lines = []
-
-        # 计算总体平均值
-        all_metrics = defaultdict(list)
-        for query_id, query_results in results.items():
-            for metric, value in query_results.items():
-                all_metrics[metric].append(value)
-
-        # 先输出每个查询的结果
-        for query_id in sorted(results.keys()):
-            query_results = results[query_id]
-            for metric in sorted(query_results.keys()):
-                value = query_results[metric]
-                output_lines.append(f"{metric:<20}\t{query_id}\t{value:.4f}")
-
-        # 输出总体平均值
-        output_lines.append("")  # 空行分隔
-        for metric in sorted(all_metrics.keys()):
-            values = all_metrics[metric]
-            avg_value = sum(values) / len(values) if values else 0.0
-            output_lines.append(f"{metric:<20}\tall\t{avg_value:.4f}")
-
-        # 保存结果
+        # 计算总体平均值：每行一个查询、每列一个指标，按列一次求均值
+        metric_means = pd.DataFrame.from_dict(results, orient='index').mean(axis=0)
+
+        # 格式化输出，逐行写入带缓冲的文件，不在内存中拼接整份结果
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(output_lines))
+        with open(output_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            # 先输出每个查询的结果
+            for query_id in sorted(results.keys()):
+                query_results = results[query_id]
+                for metric in sorted(query_results.keys()):
+                    value = query_results[metric]
+                    f.write(f"{metric:<20}\t{query_id}\t{value:.4f}\n")
+
+            # 输出总体平均值（与查询结果之间空一行，文件末尾不带换行）
+            for metric, avg_value in metric_means.sort_index().items():
+                f.write(f"\n{metric:<20}\tall\t{avg_value:.4f}")
 
         print(f"评估结果保存到: {output_file}")
 
@@ -119,41 +119,24 @@ def run_pytrec_eval(qrels_file: str, runs_file: str, output_file: str):
         print("关键指标 (平均值):")
         key_metrics = ['map', 'ndcg', 'P_4', 'recall_4', 'bpref']
         for metric in key_metrics:
-            if metric in all_metrics:
-                values = all_metrics[metric]
-                avg_value = sum(values) / len(values)
-                print(f"  {metric.upper()}: {avg_value:.4f}")
+            if metric in metric_means:
+                print(f"  {metric.upper()}: {metric_means[metric]:.4f}")
 
-        return True
+        return {metric: f"{avg_value:.4f}" for metric, avg_value in metric_means.items()}
 
     except Exception as e:
         print(f"评估过程中出错: {e}")
-        return False
+        return None
 
-def generate_tex_summary(txt_file: str, tex_file: str, method_name: str):
+def generate_tex_summary(metrics: dict, tex_file: str, method_name: str):
     """
     生成LaTeX格式的评估摘要
 
     Args:
-        txt_file: trec_eval文本结果文件
+        metrics: run_pytrec_eval返回的平均值指标，无需重新解析文本结果文件
         tex_file: 输出LaTeX文件路径
         method_name: 方法名称
     """
-    if not os.path.exists(txt_file):
-        print(f"❌ 文本结果文件不存在: {txt_file}")
-        return
-
-    # 读取平均值指标
-    metrics = {}
-
-    with open(txt_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            parts = line.strip().split('\t')
-            if len(parts) >= 3 and parts[1] == "all":
-                metric_name = parts[0].strip()
-                value = parts[2]
-                metrics[metric_name] = value
-
     # 生成LaTeX表格
     latex_content = f"""% Romeo & Juliet RAG System - {method_name} 评估结果
 \\begin{{table}}[h]
@@ -202,17 +185,14 @@ def clear_old_results():
 
     print("=== 清理旧的RMIT评估结果 ===")
 
-    # 备份旧文件
+    # 备份旧文件：整个目录改名为备份目录，不复制文件内容
     backup_dir = "target/trec_eval_results_backup_rmit"
-    if os.path.exists(results_dir):
-        if os.path.exists(backup_dir):
-            shutil.rmtree(backup_dir)
-        shutil.copytree(results_dir, backup_dir)
-        print(f"旧文件已备份到: {backup_dir}")
+    if os.path.exists(backup_dir):
+        shutil.rmtree(backup_dir)
+    os.rename(results_dir, backup_dir)
+    print(f"旧文件已备份到: {backup_dir}")
 
-    # 清空目录
-    if os.path.exists(results_dir):
-        shutil.rmtree(results_dir)
+    # 重建空目录
     os.makedirs(results_dir, exist_ok=True)
 
     print("旧评估结果已清理")
@@ -253,6 +233,14 @@ def main():
         }
     ]
 
+    # qrels只解析一次，评估器在各runs文件之间复用；
+    # 加载失败时不中断，与逐个评估时一样在每个runs上报告错误
+    try:
+        evaluator = create_evaluator(qrels_file)
+        evaluator_error = None
+    except Exception as e:
+        evaluator, evaluator_error = None, e
+
     success_count = 0
 
     for config in runs_configs:
@@ -268,9 +256,14 @@ def main():
             continue
 
         # 生成trec_eval结果
-        if run_pytrec_eval(qrels_file, runs_file, output_txt):
+        if evaluator is None:
+            print(f"评估过程中出错: {evaluator_error}")
+            metrics = None
+        else:
+            metrics = run_pytrec_eval(evaluator, runs_file, output_txt)
+        if metrics is not None:
             # 生成LaTeX摘要
-            generate_tex_summary(output_txt, output_tex, method_name)
+            generate_tex_summary(metrics, output_tex, method_name)
             success_count += 1
         else:
             print(f"❌ {method_name} 评估失败")
@@ -4,17 +4,96 @@ Oracle评估：假设我们已经完美分类了问题类型
 用于计算理论性能上限
 """
 
+import argparse
 import os
+import json
+import numpy as np
 import pandas as pd
 import pytrec_eval
-from collections import defaultdict
 
-def oracle_evaluation():
+PARQUET_CACHE_DIR = "target/parquet_cache"
+# 默认只计算对比中用到的指标；bpref开销最大，仅在--full-metrics时计算
+METRICS = ['map', 'ndcg', 'P_4', 'recall_4']
+FULL_METRICS = METRICS + ['bpref']
+
+def read_cached_table(source_file: str, parse):
+    """
+    读取文本表格，源文件未变化时直接读取PARQUET_CACHE_DIR中的Parquet缓存
+
+    缓存旁的.meta.json记录源文件的mtime和大小，任一变化即重新解析并重写缓存；
+    缓存不放在源文件旁，避免混入data/和target/runs/的文件列表
+
+    Args:
+        source_file: 文本文件路径
+        parse: 解析源文件并返回DataFrame的函数
+
+    Returns:
+        pd.DataFrame: 解析结果
+    """
+    cache_name = os.path.normpath(source_file).replace(os.sep, "__")
+    cache_file = os.path.join(PARQUET_CACHE_DIR, cache_name + ".parquet")
+    meta_file = os.path.join(PARQUET_CACHE_DIR, cache_name + ".meta.json")
+    stat = os.stat(source_file)
+    signature = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    try:
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            if json.load(f) == signature:
+                return pd.read_parquet(cache_file, engine='pyarrow')
+    except (OSError, ValueError, ImportError):
+        pass
+
+    df = parse(source_file)
+    try:
+        os.makedirs(PARQUET_CACHE_DIR, exist_ok=True)
+        df.to_parquet(cache_file, engine='pyarrow', compression='zstd', index=False)
+        # 先写缓存再写元数据，元数据存在即表示缓存完整
+        with open(meta_file, 'w', encoding='utf-8') as f:
+            json.dump(signature, f)
+    except (OSError, ImportError):
+        pass
+    return df
+
+def parse_runs_file(runs_file: str) -> pd.DataFrame:
+    """解析TREC格式的runs文件"""
+    # 由pandas的C解析器一次读入，round_trip保证分数与float()解析结果一致
+    # qid读为category，分组时按整数编码进行
+    df = pd.read_csv(runs_file, sep=r'\s+', header=None, engine='c', memory_map=True,
+                     names=['qid', 'Q0', 'pid', 'rank', 'score', 'run_name'],
+                     float_precision='round_trip',
+                     dtype={'qid': 'category', 'Q0': str, 'pid': str, 'run_name': str})
+    return df.dropna(subset=['run_name'])
+
+def parse_qrels_file(qrels_file: str) -> pd.DataFrame:
+    """解析制表符分隔的qrels文件"""
+    # qid与runs一样读为category，分组时按整数编码进行
+    return pd.read_csv(qrels_file, sep="\t", header=None,
+                       names=['qid', 'Q0', 'pid', 'rel'], dtype={'qid': 'category'})
+
+def load_runs(runs_file: str):
+    """
+    加载runs文件
+
+    Args:
+        runs_file: runs文件路径
+
+    Returns:
+        dict: {qid: {pid: score}}检索结果字典
+    """
+    df = read_cached_table(runs_file, parse_runs_file)
+
+    return {qid: dict(zip(group['pid'], group['score'].astype('float64').tolist()))
+            for qid, group in df.groupby('qid', sort=False, observed=True)}
+
+def oracle_evaluation(metrics=METRICS):
     """
     Oracle评估：对每种问题类型使用最优方法
     - Known: Hybrid 3-Level (DPR+MiniLM)
     - Inferred: FAISS (MiniLM) - 95%准确率
     - Out-of-KB: 不返回结果
+
+    Args:
+        metrics: 交给pytrec_eval计算的指标列表
     """
 
     print("=" * 80)
@@ -23,63 +102,42 @@ def oracle_evaluation():
 
     # 读取数据
     question_types = pd.read_csv("data/question_types.csv")
-    qrels_df = pd.read_csv("data/qrels.txt", sep="\t", header=None,
-                          names=['qid', 'Q0', 'pid', 'rel'])
+    qrels_df = read_cached_table("data/qrels.txt", parse_qrels_file)
 
     # 读取各方法的runs
     print("\n加载各方法的runs文件...")
 
     # Hybrid 3-Level的runs
-    hybrid_runs = defaultdict(dict)
-    with open("target/runs/romeo-juliet-hybrid.txt", 'r') as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) >= 6:
-                hybrid_runs[parts[0]][parts[2]] = float(parts[4])
+    hybrid_runs = load_runs("target/runs/romeo-juliet-hybrid.txt")
 
     # MiniLM的runs（用于Inferred）
-    minilm_runs = defaultdict(dict)
-    with open("target/runs/romeo-juliet-faiss.txt", 'r') as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) >= 6:
-                minilm_runs[parts[0]][parts[2]] = float(parts[4])
+    minilm_runs = load_runs("target/runs/romeo-juliet-faiss.txt")
 
     # 构建Oracle runs
     print("\n构建Oracle runs（每种问题类型使用最优方法）...")
-    oracle_runs = defaultdict(dict)
-
-    known_count = 0
-    inferred_count = 0
-    out_of_kb_count = 0
-
-    for _, row in question_types.iterrows():
-        qid = row['question_id']
-        qtype = row['question_type']
-
-        if qtype == 'Known':
-            # Known使用Hybrid 3-Level
-            if qid in hybrid_runs:
-                oracle_runs[qid] = hybrid_runs[qid]
-                known_count += 1
-        elif qtype == 'Inferred':
-            # Inferred使用MiniLM
-            if qid in minilm_runs:
-                oracle_runs[qid] = minilm_runs[qid]
-                inferred_count += 1
-        else:  # Out-of-KB
-            # Out-of-KB不返回结果
-            out_of_kb_count += 1
-            pass
+    # 一次分组得到每种类型的问题集合，与各方法runs的键求交
+    type_qids = question_types.groupby('question_type')['question_id'].agg(set).to_dict()
+
+    # Known使用Hybrid 3-Level
+    known_ids = type_qids.get('Known', set()) & hybrid_runs.keys()
+    oracle_runs = {qid: hybrid_runs[qid] for qid in known_ids}
+
+    # Inferred使用MiniLM
+    inferred_ids = type_qids.get('Inferred', set()) & minilm_runs.keys()
+    oracle_runs.update({qid: minilm_runs[qid] for qid in inferred_ids})
+
+    # Out-of-KB不返回结果
+    known_count = len(known_ids)
+    inferred_count = len(inferred_ids)
+    out_of_kb_count = int((~question_types['question_type'].isin(['Known', 'Inferred'])).sum())
 
     print(f"  Known问题: {known_count} (使用Hybrid 3-Level)")
     print(f"  Inferred问题: {inferred_count} (使用FAISS MiniLM)")
     print(f"  Out-of-KB问题: {out_of_kb_count} (不返回结果)")
 
-    # 加载qrels
-    qrels = defaultdict(dict)
-    for _, row in qrels_df.iterrows():
-        qrels[row['qid']][row['pid']] = row['rel']
+    # 加载qrels：按qid分组一次构建嵌套字典
+    qrels = {qid: dict(zip(group['pid'], group['rel'].astype('int16').tolist()))
+             for qid, group in qrels_df.groupby('qid', sort=False, observed=True)}
 
     # 分别评估各类型
     print("\n" + "=" * 80)
@@ -89,32 +147,23 @@ def oracle_evaluation():
     results_by_type = {}
 
     for qtype in ['Known', 'Inferred']:
-        type_questions = set(question_types[question_types['question_type'] == qtype]['question_id'])
+        type_questions = type_qids.get(qtype, set())
 
-        # 过滤qrels和runs
-        type_qrels = {qid: qrels[qid] for qid in type_questions if qid in qrels}
-        type_runs = {qid: oracle_runs[qid] for qid in type_questions if qid in oracle_runs}
+        # 过滤qrels和runs（集合与字典键求交）
+        type_qrels = {qid: qrels[qid] for qid in type_questions & qrels.keys()}
+        type_runs = {qid: oracle_runs[qid] for qid in type_questions & oracle_runs.keys()}
 
         if not type_qrels or not type_runs:
             continue
 
         # 评估
-        evaluator = pytrec_eval.RelevanceEvaluator(type_qrels, {'map', 'ndcg', 'P_4', 'recall_4', 'bpref'})
+        evaluator = pytrec_eval.RelevanceEvaluator(type_qrels, set(metrics))
         results = evaluator.evaluate(type_runs)
 
-        # 计算平均值
-        metrics = defaultdict(list)
-        for qid, res in results.items():
-            for metric, value in res.items():
-                metrics[metric].append(value)
-
-        avg_metrics = {
-            'map': sum(metrics['map']) / len(metrics['map']) if metrics['map'] else 0,
-            'ndcg': sum(metrics['ndcg']) / len(metrics['ndcg']) if metrics['ndcg'] else 0,
-            'P_4': sum(metrics['P_4']) / len(metrics['P_4']) if metrics['P_4'] else 0,
-            'recall_4': sum(metrics['recall_4']) / len(metrics['recall_4']) if metrics['recall_4'] else 0,
-            'bpref': sum(metrics['bpref']) / len(metrics['bpref']) if metrics['bpref'] else 0
-        }
+        # 计算平均值：每行一个查询、每列一个指标，按列一次求均值
+        avg_metrics = (pd.DataFrame.from_dict(results, orient='index').mean()
+                       .reindex(metrics, fill_value=0)
+                       .to_dict())
 
         results_by_type[qtype] = avg_metrics
 
@@ -123,7 +172,8 @@ def oracle_evaluation():
         print(f"  NDCG: {avg_metrics['ndcg']:.4f}")
         print(f"  P@4: {avg_metrics['P_4']:.4f}")
         print(f"  Recall@4: {avg_metrics['recall_4']:.4f}")
-        print(f"  BPref: {avg_metrics['bpref']:.4f}")
+        if 'bpref' in avg_metrics:
+            print(f"  BPref: {avg_metrics['bpref']:.4f}")
 
     # Out-of-KB
     print(f"\n【Out-of-KB问题 - Oracle】")
@@ -158,19 +208,15 @@ def oracle_evaluation():
 
     # Oracle整体（加权平均）
     total_questions = known_count + inferred_count + out_of_kb_count
-    oracle_overall_ndcg = (
-        results_by_type['Known']['ndcg'] * known_count +
-        results_by_type['Inferred']['ndcg'] * inferred_count
-    ) / (known_count + inferred_count)
-
-    oracle_overall_p4 = (
-        results_by_type['Known']['P_4'] * known_count +
-        results_by_type['Inferred']['P_4'] * inferred_count
-    ) / (known_count + inferred_count)
+    answered_types = ['Known', 'Inferred']
+    type_counts = np.array([known_count, inferred_count])
+    oracle_overall = {metric: np.average([results_by_type[qtype][metric] for qtype in answered_types],
+                                         weights=type_counts)
+                      for metric in metrics}
 
     print(f"\nOracle（完美分类）:")
-    print(f"  整体NDCG: {oracle_overall_ndcg:.4f}")
-    print(f"  整体P@4: {oracle_overall_p4:.4f}")
+    print(f"  整体NDCG: {oracle_overall['ndcg']:.4f}")
+    print(f"  整体P@4: {oracle_overall['P_4']:.4f}")
     print(f"  Out-of-KB识别率: 100%")
 
     print(f"\n实际Hybrid 3-Level（自动分类）:")
@@ -179,8 +225,8 @@ def oracle_evaluation():
     print(f"  Out-of-KB识别率: 45%")
 
     print(f"\n提升潜力:")
-    print(f"  NDCG可提升: {(oracle_overall_ndcg/0.5099 - 1)*100:.1f}%")
-    print(f"  P@4可提升: {(oracle_overall_p4/0.4794 - 1)*100:.1f}%")
+    print(f"  NDCG可提升: {(oracle_overall['ndcg']/0.5099 - 1)*100:.1f}%")
+    print(f"  P@4可提升: {(oracle_overall['P_4']/0.4794 - 1)*100:.1f}%")
     print(f"  Out-of-KB识别可提升: {(100/45 - 1)*100:.1f}%")
 
     print("\n" + "=" * 80)
@@ -196,8 +242,13 @@ def oracle_evaluation():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Oracle评估：计算理论性能上限")
+    parser.add_argument("--full-metrics", action="store_true",
+                        help="同时计算开销较大的bpref指标")
+    args = parser.parse_args()
+
     if not os.path.exists("data/question_types.csv"):
         print("❌ 请在quantitative_eval目录中运行此脚本")
         exit(1)
 
-    oracle_evaluation()
+    oracle_evaluation(FULL_METRICS if args.full_metrics else METRICS)
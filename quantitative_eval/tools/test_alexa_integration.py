@@ -6,68 +6,155 @@
 
 import json
 import random
+from functools import lru_cache, partial
 
+import numpy as np
+from scipy.sparse import csc_matrix
+
+# 安装了orjson时用它解析JSON，否则回退到标准库json；
+# orjson.JSONDecodeError是json.JSONDecodeError的子类，异常处理无需区分
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# 响应选择使用独立的随机数生成器，不依赖random模块的全局状态
+_RNG = random.Random()
+
+@lru_cache(maxsize=1)
 def load_interaction_model():
-    """加载交互模型"""
+    """加载交互模型（同一进程内只读取一次），返回解析后的JSON，不附加任何字段"""
     try:
-        with open('src/intent-based/interactionModels/custom/en-US-complete.json', 'r', encoding='utf-8') as f:
-            model = json.load(f)
-        return model
+        with open('src/intent-based/interactionModels/custom/en-US-complete.json', 'rb') as f:
+            return json_loads(f.read())
     except FileNotFoundError:
         print("Error: Interaction model file not found!")
         return None
 
+class SampleIndex:
+    """
+    交互模型中自定义意图样例的倒排索引，与交互模型JSON分开保存
+
+    把样例构建为二值稀疏词矩阵（行为样例，列为小写词），并由其按列得到
+    词→样例的倒排索引，供每次查询复用。Amazon内置意图不参与匹配，构建时即排除
+
+    Attributes:
+        intent_names: 各自定义意图名
+        sample_lens: 各样例的词数
+        sample_intents: 各样例所属意图的下标
+        inverted: 词到包含该词的样例下标数组的映射
+    """
+
+    def __init__(self, interaction_model):
+        intents = [intent for intent in interaction_model['interactionModel']['languageModel']['intents']
+                   if not intent['name'].startswith('AMAZON.')]
+        vocabulary = {}
+        rows, cols, sample_lens, sample_intents = [], [], [], []
+
+        for intent_idx, intent in enumerate(intents):
+            for sample in intent.get('samples', []):
+                tokens = set(sample.lower().split())
+                row = len(sample_lens)
+                for token in tokens:
+                    rows.append(row)
+                    cols.append(vocabulary.setdefault(token, len(vocabulary)))
+                sample_lens.append(len(tokens))
+                sample_intents.append(intent_idx)
+
+        # CSC格式中每一列的行下标即该词的倒排列表
+        postings = csc_matrix((np.ones(len(rows)), (rows, cols)),
+                              shape=(len(sample_lens), len(vocabulary)))
+        self.intent_names = [intent['name'] for intent in intents]
+        self.sample_lens = np.array(sample_lens, dtype=np.float64)
+        self.sample_intents = np.array(sample_intents, dtype=np.intp)
+        self.inverted = {token: postings.indices[postings.indptr[col]:postings.indptr[col + 1]]
+                         for token, col in vocabulary.items()}
+
+@lru_cache(maxsize=1)
 def load_intent_mapping():
-    """加载意图映射"""
+    """
+    加载意图映射（同一进程内只读取一次）
+    预先解析passage_hardcoded中的JSON响应列表，并以intent建立有序索引，
+    使get_intent_response按索引切片查找而不是逐行比较
+    """
     try:
         import pandas as pd
         intent_df = pd.read_csv('data/intent_mapping.csv')
+        intent_df['_responses'] = intent_df['passage_hardcoded'].map(parse_responses)
+        # 稳定排序保证同名意图仍按文件中的先后顺序排列
+        intent_df = intent_df.set_index('intent', drop=False).sort_index(kind='stable')
         return intent_df
     except Exception as e:
         print(f"Error loading intent mapping: {e}")
         return None
 
-def find_matching_intent(user_input, interaction_model):
+def parse_responses(passage_hardcoded):
+    """解析响应JSON为元组，缺失或格式错误时返回None"""
+    if not isinstance(passage_hardcoded, str):
+        return None
+    try:
+        return tuple(json_loads(passage_hardcoded))
+    except json.JSONDecodeError:
+        return None
+
+class IntentMatcher:
     """
-    简单的意图匹配模拟
-    在实际Alexa中，这由NLU引擎处理
+    绑定一个交互模型的意图匹配器
+    样例索引在构建时生成一次；匹配只取决于小写词集合，结果缓存在本实例的
+    lru_cache中，随实例一起释放，不同模型的结果互不干扰
     """
-    user_input_lower = user_input.lower()
 
-    intents = interaction_model['interactionModel']['languageModel']['intents']
+    def __init__(self, interaction_model):
+        self.index = SampleIndex(interaction_model)
+        self.match_token_set = lru_cache(maxsize=512)(partial(score_token_set, self.index))
 
-    # 按匹配分数排序
-    matches = []
+    def match(self, user_input):
+        """匹配用户输入，相同词集合的重复提问直接命中缓存"""
+        return self.match_token_set(frozenset(user_input.lower().split()))
 
-    for intent in intents:
-        intent_name = intent['name']
+@lru_cache(maxsize=1)
+def load_intent_matcher():
+    """基于load_interaction_model的结果构建意图匹配器（同一进程内只构建一次）"""
+    interaction_model = load_interaction_model()
+    if not interaction_model:
+        return None
+    return IntentMatcher(interaction_model)
 
-        # 跳过Amazon内置意图的匹配
-        if intent_name.startswith('AMAZON.'):
-            continue
+def find_matching_intent(user_input, interaction_model):
+    """
+    简单的意图匹配模拟
+    在实际Alexa中，这由NLU引擎处理
 
-        samples = intent.get('samples', [])
+    Args:
+        user_input: 用户输入
+        interaction_model: IntentMatcher，或交互模型JSON（此时临时构建匹配器，不缓存）
+    """
+    if not isinstance(interaction_model, IntentMatcher):
+        interaction_model = IntentMatcher(interaction_model)
+    return interaction_model.match(user_input)
 
-        # 计算匹配分数
-        max_score = 0
-        for sample in samples:
-            sample_words = set(sample.lower().split())
-            user_words = set(user_input_lower.split())
+def score_token_set(index, user_words):
+    """用样例索引为词集合打分，返回最佳意图或AMAZON.FallbackIntent"""
+    inverted = index.inverted
 
-            # 简单的词汇重叠分数
-            overlap = len(sample_words.intersection(user_words))
-            score = overlap / len(sample_words.union(user_words)) if sample_words.union(user_words) else 0
+    # 只有与查询共享至少一个词的样例才可能得分；没有候选时直接回退
+    postings = [inverted[word] for word in user_words if word in inverted]
+    if not postings:
+        return "AMAZON.FallbackIntent"
 
-            max_score = max(max_score, score)
+    # 候选样例及其与查询的重叠词数
+    candidates, overlap = np.unique(np.concatenate(postings), return_counts=True)
 
-        if max_score > 0:
-            matches.append((intent_name, max_score))
+    # 简单的词汇重叠分数（Jaccard），再取每个意图所有样例中的最大值
+    union_len = index.sample_lens[candidates] + len(user_words) - overlap
+    sample_scores = overlap / union_len
+    intent_scores = np.zeros(len(index.intent_names))
+    np.maximum.at(intent_scores, index.sample_intents[candidates], sample_scores)
 
-    # 返回最佳匹配
-    if matches:
-        matches.sort(key=lambda x: x[1], reverse=True)
-        if matches[0][1] > 0.2:  # 最小匹配阈值
-            return matches[0][0]
+    # 返回最佳匹配；argmax在并列时取模型中靠前的意图，与稳定排序结果一致
+    best = int(intent_scores.argmax())
+    if intent_scores[best] > 0.2:  # 最小匹配阈值
+        return index.intent_names[best]
 
     return "AMAZON.FallbackIntent"
 
@@ -77,23 +164,21 @@ def get_intent_response(intent_name, intent_df):
         return "I didn't understand that question about Romeo and Juliet. Try asking about specific characters, scenes, or themes."
 
     # 查找意图的响应
-    intent_rows = intent_df[intent_df['intent'] == intent_name]
+    intent_rows = intent_df.loc[intent_name:intent_name]
     if not intent_rows.empty:
-        passage_hardcoded = intent_rows.iloc[0]['passage_hardcoded']
-        try:
-            responses = json.loads(passage_hardcoded)
-            return random.choice(responses)
-        except json.JSONDecodeError:
+        responses = intent_rows.iloc[0]['_responses']
+        if responses is None:
             return f"I can tell you about {intent_name.replace('_', ' ').lower()}."
+        return _RNG.choice(responses)
 
     return f"I found information about {intent_name.replace('_', ' ').lower()}."
 
-def simulate_alexa_response(user_input, interaction_model, intent_df):
+def simulate_alexa_response(user_input, intent_matcher, intent_df):
     """模拟完整的Alexa响应流程"""
     print(f"\n👤 User: {user_input}")
 
     # 意图识别
-    matched_intent = find_matching_intent(user_input, interaction_model)
+    matched_intent = find_matching_intent(user_input, intent_matcher)
     print(f"🧠 Matched Intent: {matched_intent}")
 
     # 生成响应
@@ -109,6 +194,7 @@ def run_test_scenarios():
     print("=== Romeo & Juliet Alexa Integration Test ===")
 
     interaction_model = load_interaction_model()
+    intent_matcher = load_intent_matcher()
     intent_df = load_intent_mapping()
 
     if not interaction_model or intent_df is None:
@@ -145,29 +231,24 @@ def run_test_scenarios():
 
     print(f"\n🧪 Running {len(test_scenarios)} test scenarios...\n")
 
-    results = []
+    # 统计只用到识别出的意图，响应在simulate_alexa_response中打印后即丢弃
+    matched_intents = []
 
     for i, scenario in enumerate(test_scenarios, 1):
         print(f"--- Test {i}/{len(test_scenarios)} ---")
-        intent, response = simulate_alexa_response(scenario, interaction_model, intent_df)
-        results.append({
-            'input': scenario,
-            'intent': intent,
-            'response': response[:100] + "..." if len(response) > 100 else response
-        })
+        intent, _ = simulate_alexa_response(scenario, intent_matcher, intent_df)
+        matched_intents.append(intent)
 
     # 统计结果
     print(f"\n" + "="*60)
     print("📊 Test Results Summary")
     print("="*60)
 
-    intent_counts = {}
-    for result in results:
-        intent = result['intent']
-        intent_counts[intent] = intent_counts.get(intent, 0) + 1
+    import pandas as pd
+    intent_counts = pd.Series(matched_intents).value_counts().sort_index()
 
     print(f"Intent Distribution:")
-    for intent, count in sorted(intent_counts.items()):
+    for intent, count in intent_counts.items():
         print(f"  {intent}: {count} times")
 
     # 显示成功识别的核心意图
@@ -176,18 +257,22 @@ def run_test_scenarios():
         'Tybalt_Insult_Romeo', 'Mercutio_Death_Curse', 'Romeo_Banishment_View'
     ]
 
-    core_matches = sum(1 for result in results if result['intent'] in core_intents)
+    core_matches = int(intent_counts.reindex(core_intents, fill_value=0).sum())
     print(f"\n核心意图识别成功率: {core_matches}/{len(core_intents)} = {core_matches/len(core_intents):.1%}")
 
-    fallback_count = intent_counts.get('AMAZON.FallbackIntent', 0)
+    fallback_count = int(intent_counts.get('AMAZON.FallbackIntent', 0))
     print(f"Fallback触发次数: {fallback_count}/{len(test_scenarios)} = {fallback_count/len(test_scenarios):.1%}")
 
+    cache_info = intent_matcher.match_token_set.cache_info()
+    print(f"意图匹配缓存: 命中 {cache_info.hits} 次, 未命中 {cache_info.misses} 次")
+
 def interactive_test():
     """交互式测试模式"""
     print(f"\n🎮 Interactive Test Mode")
     print("Type your questions about Romeo and Juliet (or 'quit' to exit):")
 
     interaction_model = load_interaction_model()
+    intent_matcher = load_intent_matcher()
     intent_df = load_intent_mapping()
 
     if not interaction_model or intent_df is None:
@@ -204,7 +289,7 @@ def interactive_test():
         if not user_input:
             continue
 
-        simulate_alexa_response(user_input, interaction_model, intent_df)
+        simulate_alexa_response(user_input, intent_matcher, intent_df)
 
 def main():
     print("Choose test mode:")